@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+from gwinstekgpp import Gwinstekgpp
+import numpy
+import threading
+import time
+
+
+class Acquisition:
+    """Poll the measures of all channels in a background thread into a preallocated ring buffer.
+
+    Each sample is a row of the buffer: the time in seconds (time.monotonic), then the voltage, the
+    current and the power of the 4 channels. Use the TIME, VOLTAGE, CURRENT and POWER column indexes to
+    select them in the arrays returned by read().
+
+    The Gwinstekgpp stays usable by the other threads during the acquisition, for exemple to change or read
+    the setpoints while capturing a transient: in request/response mode its transactions are serialized, and
+    in pipelined mode the commands of all the threads are queued in order. The acquisition does not change
+    the mode.
+    """
+    TIME = 0
+    VOLTAGE = slice(1, 5)
+    CURRENT = slice(5, 9)
+    POWER = slice(9, 13)
+    COLUMNS = 13
+
+    def __init__(self, gwinstekgpp: Gwinstekgpp, capacity: int = 65536, period: float = 0.0):
+        """Prepare an acquisition, start() begins the polling.
+
+        @param capacity: Number of samples kept in the ring buffer
+        @param period: Minimum duration in seconds between two samples, 0 to poll as fast as the link allows
+        """
+        self._gwinstekgpp = gwinstekgpp
+        self._buffer = numpy.zeros((capacity, Acquisition.COLUMNS))
+        self._period = period
+        self._count = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: threading.Thread|None = None
+        self._error: Exception|None = None
+        self._command = ";".join(f":MEAS:{measureType.toSerialStr()}:ALL?" for measureType in
+                                 (Gwinstekgpp.MeasureType.VOLTAGE, Gwinstekgpp.MeasureType.CURRENT,
+                                  Gwinstekgpp.MeasureType.POWER))
+
+    def __enter__(self) -> "Acquisition":
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.shape[0]
+
+    @property
+    def count(self) -> int:
+        """Total number of samples acquired since start, including the ones overwritten in the buffer."""
+        return self._count
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="GwinstekgppAcquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the polling, the buffer stays readable."""
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        capacity = self.capacity
+        nextTime = time.monotonic()
+        try:
+            while self._running:
+                # The three measures of all channels in one round trip, parsed directly in the ring buffer
+                row = self._buffer[self._count % capacity]
+                self._gwinstekgpp._queryInto(self._command, row, Acquisition.VOLTAGE.start, 12)
+                row[Acquisition.TIME] = time.monotonic()
+                with self._condition:
+                    self._count += 1
+                    self._condition.notify_all()
+                if self._period > 0.0:
+                    nextTime += self._period
+                    delay = nextTime - time.monotonic()
+                    if delay > 0.0:
+                        time.sleep(delay)
+                    else:
+                        nextTime = time.monotonic()
+        except Exception as exception:
+            self._error = exception
+            self._running = False
+            with self._condition:
+                self._condition.notify_all()
+
+    def wait(self, since: int, timeout: float|None = None) -> bool:
+        """Block until more than since samples have been acquired.
+
+        @return: False if the timeout expired or the acquisition stopped before
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count > since or not self._running, timeout) \
+                and self._count > since
+
+    def read(self, since: int) -> tuple[list[numpy.ndarray], int]:
+        """Return views on the samples acquired after the since first ones, without copy.
+
+        The samples are returned in one view, or in two views when they wrap around the end of the ring
+        buffer. Samples older than the capacity have been overwritten and are skipped. The views are
+        overwritten by the acquisition after capacity new samples, copy them to keep them longer.
+
+        @return: The list of views and the count to give as since to the next call
+        """
+        count = self._count
+        capacity = self.capacity
+        since = max(since, count - capacity)
+        if since >= count:
+            return [], count
+        start = since % capacity
+        end = count % capacity
+        if start < end:
+            return [self._buffer[start:end]], count
+        if end == 0:
+            return [self._buffer[start:]], count
+        return [self._buffer[start:], self._buffer[:end]], count
+
+    def latest(self, count: int) -> numpy.ndarray:
+        """Return a copy of the last count samples in acquisition order."""
+        views, _ = self.read(self._count - count)
+        if len(views) == 0:
+            return numpy.empty((0, Acquisition.COLUMNS))
+        return numpy.concatenate(views)
+
+
+if __name__ == "__main__":
+    gwinstekgpp = Gwinstekgpp("/dev/ttyUSB0")
+    with Acquisition(gwinstekgpp) as acquisition:
+        since = 0
+        while since < 100:
+            acquisition.wait(since)
+            views, since = acquisition.read(since)
+            for view in views:
+                for sample in view:
+                    print(f"{sample[Acquisition.TIME]:.3f}: voltage={sample[Acquisition.VOLTAGE]} "
+                          f"current={sample[Acquisition.CURRENT]}")
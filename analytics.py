@@ -0,0 +1,175 @@
+"""Vectorized analysis of the DC-DC efficiency points recorded by results.Recorder.
+
+The functions take and return the columns as a dict of NumPy arrays by name, as returned by results.load(), with
+the names of Scheduler.COLUMNS. They work on whole columns at once, so datasets of a fleet of instruments are
+processed in a few milliseconds. For exemple:
+
+    columns, metadata = results.load("sweep.npy")
+    averaged = analytics.average(columns)
+    averaged |= analytics.powers(averaged) | analytics.uncertainty(averaged)
+    inputVoltages, outputCurrents, efficiency = analytics.efficiencyMap(averaged)
+"""
+import math
+import numpy
+from typing import Sequence
+
+
+Columns = dict[str, numpy.ndarray]
+
+# Resolution of the GPP-4323 voltage and current measures
+VOLTAGE_RESOLUTION = 0.001 # V
+CURRENT_RESOLUTION = 0.001 # A
+# Measured columns, with the resolution of each
+MEASURES = {"inputVoltage": VOLTAGE_RESOLUTION, "inputCurrent": CURRENT_RESOLUTION,
+            "ouputVoltage": VOLTAGE_RESOLUTION, "outputCurrent": CURRENT_RESOLUTION}
+KEYS = ("inputVoltageSet", "outputCurrentSet")
+
+
+def _group(columns: Columns, keys: Sequence[str]) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """@return: The distinct rows of the keys columns, sorted, and the index of the row of each sample"""
+    # Much faster than numpy.unique(axis=0): the index of each key is combined in one integer code
+    codes = numpy.zeros(len(columns[keys[0]]), dtype=numpy.int64)
+    values = []
+    for key in keys:
+        # Setpoints computed by float arithmetic, for exemple by Axis.range, may differ in the last digits
+        unique, indexes = numpy.unique(numpy.round(columns[key], 9), return_inverse=True)
+        codes = codes * len(unique) + indexes.reshape(-1)
+        values.append(unique)
+    codes, groups = numpy.unique(codes, return_inverse=True)
+    rows = []
+    for unique in reversed(values):
+        rows.append(unique[codes % len(unique)])
+        codes = codes // len(unique)
+    return numpy.column_stack(rows[::-1]), groups.reshape(-1)
+
+
+def _groupMedian(values: numpy.ndarray, groups: numpy.ndarray, counts: numpy.ndarray) -> numpy.ndarray:
+    ordered = values[numpy.lexsort((values, groups))]
+    starts = numpy.cumsum(counts) - counts
+    return (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2.0
+
+
+def powers(columns: Columns) -> Columns:
+    """Compute the input power, output power, power loss in W and efficiency in % of each point.
+
+    The efficiency is 0 where the input power is 0, like the points measured by the sweeps.
+    """
+    inputPower = columns["inputVoltage"] * columns["inputCurrent"]
+    outputPower = columns["ouputVoltage"] * columns["outputCurrent"]
+    efficiency = numpy.divide(outputPower * 100.0, inputPower, out=numpy.zeros_like(inputPower),
+                              where=inputPower != 0.0)
+    return {"inputPower": inputPower, "outputPower": outputPower, "loss": inputPower - outputPower,
+            "efficiency": efficiency}
+
+
+def average(columns: Columns, keys: Sequence[str] = KEYS, threshold: float = 3.5) -> Columns:
+    """Average the repeated samples of each setpoint, rejecting the outliers of each column separately.
+
+    A sample is an outlier when its modified z-score 0.6745 * |x - median| / MAD is above threshold, with MAD the
+    median absolute deviation of the samples of the same setpoint. When more than half of the samples are equal,
+    which is common with the measures resolution, the mean absolute deviation is used instead of the MAD.
+
+    @param keys: The columns giving the setpoint of a sample, for exemple add a DUT number column for a fleet
+    dataset
+    @return: One row per setpoint, sorted by keys, with the mean of the other columns, their standard deviation in
+    "<column>Std" and the number of samples kept in "<column>Count"
+    """
+    unique, groups = _group(columns, keys)
+    counts = numpy.bincount(groups, minlength=len(unique))
+    result = {key: unique[:, index] for index, key in enumerate(keys)}
+    for name, values in columns.items():
+        if name in keys:
+            continue
+        values = numpy.asarray(values, dtype=float)
+        deviation = numpy.abs(values - _groupMedian(values, groups, counts)[groups])
+        mad = _groupMedian(deviation, groups, counts)
+        meanDeviation = numpy.bincount(groups, weights=deviation, minlength=len(unique)) / counts
+        scale = numpy.where(mad > 0.0, mad / 0.6745, meanDeviation * 1.253314)[groups]
+        # With a scale of 0 all the samples are equal to the median, none is an outlier
+        kept = deviation <= threshold * scale
+        keptCounts = numpy.bincount(groups, weights=kept, minlength=len(unique))
+        mean = numpy.bincount(groups, weights=values * kept, minlength=len(unique)) / keptCounts
+        squares = numpy.bincount(groups, weights=(values - mean[groups]) ** 2 * kept, minlength=len(unique))
+        result[name] = mean
+        result[f"{name}Std"] = numpy.sqrt(numpy.divide(squares, keptCounts - 1, out=numpy.zeros_like(squares),
+                                                       where=keptCounts > 1))
+        result[f"{name}Count"] = keptCounts.astype(int)
+    return result
+
+
+def uncertainty(columns: Columns, measures: dict[str, float]|None = None) -> Columns:
+    """Compute the standard uncertainty of the powers, loss and efficiency of each point.
+
+    Each measure is rounded by the instrument to its resolution, so its standard uncertainty is
+    resolution / sqrt(12). For the columns returned by average(), the standard error of the mean
+    "<column>Std" / sqrt("<column>Count") is combined with it. Uncertainties are propagated at first order, the
+    input and output channels being independent. The efficiency uncertainty is NaN where the input power is 0.
+
+    @param measures: The resolution of each measured column, by default MEASURES
+    @return: "inputPowerUncertainty", "outputPowerUncertainty" and "lossUncertainty" in W and
+    "efficiencyUncertainty" in %
+    """
+    uncertainties = dict()
+    for name, resolution in (measures or MEASURES).items():
+        variance = numpy.full(len(columns[name]), resolution ** 2 / 12.0)
+        if f"{name}Std" in columns:
+            variance += columns[f"{name}Std"] ** 2 / columns[f"{name}Count"]
+        uncertainties[name] = numpy.sqrt(variance)
+    inputVoltage, inputCurrent = columns["inputVoltage"], columns["inputCurrent"]
+    ouputVoltage, outputCurrent = columns["ouputVoltage"], columns["outputCurrent"]
+    inputPower, outputPower = inputVoltage * inputCurrent, ouputVoltage * outputCurrent
+    inputPowerUncertainty = numpy.hypot(inputCurrent * uncertainties["inputVoltage"],
+                                        inputVoltage * uncertainties["inputCurrent"])
+    outputPowerUncertainty = numpy.hypot(outputCurrent * uncertainties["ouputVoltage"],
+                                         ouputVoltage * uncertainties["outputCurrent"])
+    # Efficiency = 100 * Pout / Pin, NaN propagates where Pin is 0
+    definedInputPower = numpy.where(inputPower != 0.0, inputPower, math.nan)
+    efficiencyUncertainty = 100.0 * numpy.hypot(outputPowerUncertainty,
+                                                outputPower / definedInputPower * inputPowerUncertainty) \
+        / definedInputPower
+    return {"inputPowerUncertainty": inputPowerUncertainty, "outputPowerUncertainty": outputPowerUncertainty,
+            "lossUncertainty": numpy.hypot(inputPowerUncertainty, outputPowerUncertainty),
+            "efficiencyUncertainty": efficiencyUncertainty}
+
+
+def lossBreakdown(columns: Columns) -> Columns:
+    """Split the power loss at each input voltage into fixed, linear and resistive parts.
+
+    The loss of each input voltage is fitted by least squares with fixed + linear * I + resistance * I^2, with I
+    the output current: the fixed part is for exemple the switching and quiescent losses, and the resistive part
+    the conduction losses. Input voltages with less than 3 different output current setpoints are NaN.
+
+    @return: "inputVoltageSet", "fixedLoss" in W, "linearLoss" in W/A and "resistance" in ohm
+    """
+    loss = columns["loss"] if "loss" in columns else powers(columns)["loss"]
+    current = columns["outputCurrent"]
+    inputVoltages, groups = _group(columns, ["inputVoltageSet"])
+    size = len(inputVoltages)
+    # Normal equations of all the input voltages at once: sum(I^(i+j)) * coefficients = sum(loss * I^i)
+    moments = numpy.stack([numpy.bincount(groups, weights=current ** power, minlength=size) for power in range(5)],
+                          axis=1)
+    matrices = numpy.stack([moments[:, row:row + 3] for row in range(3)], axis=1)
+    vectors = numpy.stack([numpy.bincount(groups, weights=loss * current ** power, minlength=size)
+                           for power in range(3)], axis=1)
+    coefficients = (numpy.linalg.pinv(matrices) @ vectors[:, :, numpy.newaxis])[:, :, 0]
+    pairs, _ = _group({"group": groups, "outputCurrentSet": columns["outputCurrentSet"]}, ["group", "outputCurrentSet"])
+    coefficients[numpy.bincount(pairs[:, 0].astype(int), minlength=size) < 3] = math.nan
+    return {"inputVoltageSet": inputVoltages[:, 0], "fixedLoss": coefficients[:, 0],
+            "linearLoss": coefficients[:, 1], "resistance": coefficients[:, 2]}
+
+
+def efficiencyMap(columns: Columns, value: str = "efficiency") \
+        -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Arrange a column on the grid of the input voltage and output current setpoints.
+
+    With repeated samples of a setpoint the last one is kept, use average() before.
+
+    @param value: The column to arrange, for exemple "efficiency" or "loss" from powers()
+    @return: The sorted input voltages, the sorted output currents, and the 2D array of value indexed by
+    [input voltage index, output current index], NaN where there is no point
+    """
+    inputVoltages, inputIndexes = numpy.unique(numpy.round(columns["inputVoltageSet"], 9), return_inverse=True)
+    outputCurrents, outputIndexes = numpy.unique(numpy.round(columns["outputCurrentSet"], 9), return_inverse=True)
+    grid = numpy.full((len(inputVoltages), len(outputCurrents)), math.nan)
+    grid[inputIndexes.reshape(-1), outputIndexes.reshape(-1)] = columns[value]
+    return inputVoltages, outputCurrents, grid
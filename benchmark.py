@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""Benchmark the command latency and the sample throughput of the driver.
+
+Run it against a real instrument with --port, or against the virtual GPP with --simulate. The results are
+printed and can be written in a JSON file with --output to compare runs after driver changes.
+"""
+from gwinstekgpp import Gwinstekgpp
+from simulator import VirtualGpp
+import argparse
+import array
+import json
+import platform
+import statistics
+import time
+from typing import Any, Callable
+
+
+def timeCalls(function: Callable[[], Any], count: int) -> list[float]:
+    """Return the duration in seconds of count calls of function."""
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summary(durations: list[float]) -> dict[str, float]:
+    durations = sorted(durations)
+    return {"count": len(durations), "min": durations[0], "median": statistics.median(durations),
+            "mean": statistics.fmean(durations), "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max": durations[-1]}
+
+
+def benchmarkLatency(gwinstekgpp: Gwinstekgpp, count: int) -> dict[str, dict[str, float]]:
+    """Round trip duration of one query of each command family."""
+    channel = gwinstekgpp.channel(1)
+    families: dict[str, Callable[[], Any]] = {
+        "identity": lambda: gwinstekgpp._query("*IDN?", bytes),
+        "legacyMeasure (VOUT)": lambda: channel.voltage,
+        "scpiMeasure (:MEAS:VOLT)": lambda: channel.measure(Gwinstekgpp.MeasureType.VOLTAGE),
+        "scpiMeasureAll (:MEAS:ALL)": lambda: channel.measure(Gwinstekgpp.MeasureType.ALL),
+        "allChannelsMeasure (:MEAS:VOLT:ALL)": lambda: gwinstekgpp.measureAll(Gwinstekgpp.MeasureType.VOLTAGE),
+        "setpoint (VSET)": lambda: channel.voltageSet,
+        "state (:OUTP:STAT)": lambda: channel.outputEnable,
+        "mode (MODE)": lambda: channel.ch1Ch2Mode,
+        "error (:SYST:ERR)": gwinstekgpp.err,
+    }
+    return {name: summary(timeCalls(function, count)) for name, function in families.items()}
+
+
+def benchmarkThroughput(gwinstekgpp: Gwinstekgpp, duration: float) -> dict[str, dict[str, float]]:
+    """Samples per second of the different ways to read the voltage, current and power."""
+    def allChannelsBatch():
+        batch = gwinstekgpp.batch()
+        for measureType in (Gwinstekgpp.MeasureType.VOLTAGE, Gwinstekgpp.MeasureType.CURRENT,
+                            Gwinstekgpp.MeasureType.POWER):
+            batch.measureAll(measureType)
+        batch.execute()
+
+    buffer = array.array("d", [0.0] * 12)
+
+    methods: dict[str, tuple[int, Callable[[], Any]]] = {
+        "singleChannelMeasureAll": (1, lambda: gwinstekgpp.channel(1).measure(Gwinstekgpp.MeasureType.ALL)),
+        "singleChannelVoltageCurrent": (1, lambda: (gwinstekgpp.channel(1).voltage, gwinstekgpp.channel(1).current)),
+        "allChannelsSequential": (4, lambda: [gwinstekgpp.channel(channel).measure(Gwinstekgpp.MeasureType.ALL)
+                                              for channel in range(1, 5)]),
+        "allChannelsMeasureAll": (4, lambda: [gwinstekgpp.measureAll(measureType) for measureType in
+                                              (Gwinstekgpp.MeasureType.VOLTAGE, Gwinstekgpp.MeasureType.CURRENT,
+                                               Gwinstekgpp.MeasureType.POWER)]),
+        "allChannelsBatch": (4, allChannelsBatch),
+        "allChannelsMeasureAllInto": (4, lambda: [gwinstekgpp.measureAllInto(measureType, buffer, index * 4)
+                                                  for index, measureType in
+                                                  enumerate((Gwinstekgpp.MeasureType.VOLTAGE,
+                                                             Gwinstekgpp.MeasureType.CURRENT,
+                                                             Gwinstekgpp.MeasureType.POWER))]),
+    }
+    results = {}
+    for name, (channels, function) in methods.items():
+        samples = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            function()
+            samples += 1
+        elapsed = time.perf_counter() - start
+        results[name] = {"samplesPerSecond": samples / elapsed, "channelSamplesPerSecond": samples * channels / elapsed}
+    return results
+
+
+def benchmarkParsing(count: int) -> dict[str, float]:
+    """Python duration in seconds to parse one response, without the wire time."""
+    parsers: dict[str, tuple[bytes, Callable[[bytes], Any]]] = {
+        "unitFloat": (b"5.000V", lambda response: float(response.removesuffix(b"V"))),
+        "float": (b"5.000", float),
+        "state": (b"ON", Gwinstekgpp._parseState),
+        "floatList3": (b"5.000,0.100,0.500", Gwinstekgpp._parseFloatList),
+        "floatList4": (b"5.000,5.000,5.000,5.000", Gwinstekgpp._parseFloatList),
+    }
+    results = {}
+    for name, (response, parser) in parsers.items():
+        line = response + b"\r\n"
+        start = time.perf_counter()
+        for _ in range(count):
+            parser(line.strip())
+        results[name] = (time.perf_counter() - start) / count
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", help="Serial port of a real instrument, for exemple /dev/ttyUSB0")
+    parser.add_argument("--simulate", action="store_true", help="Use the virtual GPP instead of a real one")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Emulated baud rate of the virtual GPP")
+    parser.add_argument("--latency", type=float, default=0.001, help="Command latency of the virtual GPP in s")
+    parser.add_argument("--count", type=int, default=50, help="Number of queries per command family")
+    parser.add_argument("--duration", type=float, default=2.0, help="Duration in s of each throughput test")
+    parser.add_argument("--output", help="JSON file to write the results")
+    arguments = parser.parse_args()
+    if arguments.simulate == (arguments.port is not None):
+        parser.error("Give either --port or --simulate")
+
+    virtualGpp = None
+    port = arguments.port
+    if arguments.simulate:
+        virtualGpp = VirtualGpp(baudrate=arguments.baudrate, latency=arguments.latency)
+        port = virtualGpp.start()
+    try:
+        gwinstekgpp = Gwinstekgpp(port)
+        results = {
+            "environment": {"port": port, "simulated": arguments.simulate, "python": platform.python_version(),
+                            "instrument": f"{gwinstekgpp.productBrand} {gwinstekgpp.productModel} "
+                                          f"{gwinstekgpp.productSerial} {gwinstekgpp.firmwareVersion}",
+                            "date": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "latency": benchmarkLatency(gwinstekgpp, arguments.count),
+            "throughput": benchmarkThroughput(gwinstekgpp, arguments.duration),
+            "parsing": benchmarkParsing(arguments.count * 1000),
+        }
+        if arguments.simulate:
+            results["environment"].update({"baudrate": arguments.baudrate, "latency": arguments.latency})
+    finally:
+        if virtualGpp is not None:
+            virtualGpp.stop()
+
+    for name, latency in results["latency"].items():
+        print(f"latency {name}: median={latency['median'] * 1e3:.2f}ms p95={latency['p95'] * 1e3:.2f}ms")
+    for name, throughput in results["throughput"].items():
+        print(f"throughput {name}: {throughput['samplesPerSecond']:.1f} samples/s "
+              f"{throughput['channelSamplesPerSecond']:.1f} channel samples/s")
+    wireMedian = results["latency"]["scpiMeasureAll (:MEAS:ALL)"]["median"]
+    for name, duration in results["parsing"].items():
+        print(f"parsing {name}: {duration * 1e6:.2f}us ({duration / wireMedian * 100:.4f}% of a :MEAS:ALL round trip)")
+    if arguments.output is not None:
+        with open(arguments.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
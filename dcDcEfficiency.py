@@ -1,26 +1,36 @@
 #!/usr/bin/python3
 
 from gwinstekgpp import Gwinstekgpp
-import time
+from sweep import Axis, Sweep
+from results import Recorder, instrumentMetadata
 import sys
+import os
 
 
 # Input
 inputVoltageSetNominal = 8.0 # V
 inputVoltageSetMin = 6.000 # V
 inputVoltageSetMax = 8.400 # V
-inputVoltageSetStep = 0.050 # V
+inputVoltageSetStep = 0.200 # V
+inputVoltageSetMinStep = 0.050 # V
+inputVoltageSlewRate = 2.0 # V/s
 inputVoltageSetChannelNum = 4
 inputVoltageMeasureChannelNum = 1
 # Output
 outputCurrentSetNominal = 0.4 # A
 outputCurrentSetMin = 0.000 # A
 outputCurrentSetMax = 1.000 # A
-outputCurrentSetStep = 0.025 # A
+outputCurrentSetStep = 0.100 # A
+outputCurrentSetMinStep = 0.025 # A
+outputCurrentSlewRate = 1.0 # A/s
 outputCurrentSetChannelNum = 2
 outputVoltageMeasureChannelNum = 3
+# Points added where the efficiency changes the most, after the sweep at Step
+refinePoints = 12
 
 gwinstekgpp = Gwinstekgpp("/dev/ttyUSB0")
+# Setpoints and modes are checked several times below, only query them once
+gwinstekgpp.enableCache()
 
 
 print("WARNING this script assume:")
@@ -53,66 +63,77 @@ for channel in [inputVoltageMeasureChannelNum, outputVoltageMeasureChannelNum]:
     assert gwinstekgpp.channel(channel).currentSet == 0.0
 
 input("Press Enter to continue...")
+# The instrument may have been changed from the front panel while waiting
+gwinstekgpp.invalidateCache()
 
 
-def printMeasure():
-    inputVoltageSet = gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet
-    outputCurrentSet = gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet
-    inputVoltage = gwinstekgpp.channel(inputVoltageMeasureChannelNum).voltage
-    inputCurrent = gwinstekgpp.channel(inputVoltageSetChannelNum).current
-    ouputVoltage = gwinstekgpp.channel(outputVoltageMeasureChannelNum).voltage
-    outputCurrent = gwinstekgpp.channel(outputCurrentSetChannelNum).current
+columns = ["inputVoltageSet", "outputCurrentSet", "inputVoltage", "inputCurrent", "ouputVoltage", "outputCurrent",
+           "inputPower", "outputPower", "efficiency"]
+
+
+def measure(gwinstekgpp: Gwinstekgpp) -> dict[str, float]:
+    batch = gwinstekgpp.batch()
+    batch.channel(inputVoltageSetChannelNum).voltageSet
+    batch.channel(outputCurrentSetChannelNum).currentSet
+    batch.channel(inputVoltageMeasureChannelNum).voltage
+    batch.channel(inputVoltageSetChannelNum).current
+    batch.channel(outputVoltageMeasureChannelNum).voltage
+    batch.channel(outputCurrentSetChannelNum).current
+    inputVoltageSet, outputCurrentSet, inputVoltage, inputCurrent, ouputVoltage, outputCurrent = batch.execute()
     inputPower = inputVoltage * inputCurrent
     outputPower = ouputVoltage * outputCurrent
     if inputPower != 0.0:
         efficiency = outputPower / inputPower * 100.0
     else:
         efficiency = 0.0
-    print(f"{inputVoltageSet}, {outputCurrentSet}, {inputVoltage}, {inputCurrent}, {ouputVoltage}, {outputCurrent}, "
-          f"{inputPower}, {outputPower}, {efficiency}")
-
-
-print("")
-gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet = inputVoltageSetNominal
-time.sleep(1)
-gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet = outputCurrentSetNominal
-inputVoltageSet = inputVoltageSetMin
-print("inputVoltageSet, outputCurrentSet, inputVoltage, inputCurrent, ouputVoltage, outputCurrent, inputPower, "
-      "outputPower, efficiency")
-while True:
-    gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet = inputVoltageSet
-    time.sleep(1)
-    printMeasure()
-    if gwinstekgpp.channel(inputVoltageSetChannelNum).currentLimitState:
-        print("ERROR current limit raise in channel input voltage")
-        break
-    inputVoltageSet += inputVoltageSetStep
-    if inputVoltageSet > inputVoltageSetMax:
-        break
-gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet = 0.0
-time.sleep(1)
-gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet = 0.0
-time.sleep(1)
-
-
-print("")
-gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet = inputVoltageSetNominal
-time.sleep(1)
-gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet = outputCurrentSetNominal
-outputCurrentSet = outputCurrentSetMin
-print("inputVoltageSet, outputCurrentSet, inputVoltage, inputCurrent, ouputVoltage, outputCurrent, inputPower, "
-      "outputPower, efficiency")
-while True:
-    gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet = outputCurrentSet
-    time.sleep(1)
-    printMeasure()
-    if gwinstekgpp.channel(inputVoltageSetChannelNum).currentLimitState:
-        print("ERROR current limit raise in channel input voltage")
-        break
-    outputCurrentSet += outputCurrentSetStep
-    if outputCurrentSet > outputCurrentSetMax:
-        break
-gwinstekgpp.channel(outputCurrentSetChannelNum).currentSet = 0.0
-time.sleep(1)
-gwinstekgpp.channel(inputVoltageSetChannelNum).voltageSet = 0.0
-time.sleep(1)
+    return {"inputVoltageSet": inputVoltageSet, "outputCurrentSet": outputCurrentSet, "inputVoltage": inputVoltage,
+            "inputCurrent": inputCurrent, "ouputVoltage": ouputVoltage, "outputCurrent": outputCurrent,
+            "inputPower": inputPower, "outputPower": outputPower, "efficiency": efficiency}
+
+
+def runSweep(axis: Axis, minStep: float, recorder: Recorder|None):
+    # Completed points are saved as measured, run the script again to resume an interrupted sweep
+    checkpoint = f"dcDcEfficiency.{axis.name}.jsonl"
+    if os.path.exists(checkpoint):
+        print(f"Resume from {checkpoint}, remove it to measure again")
+    sweep = Sweep(gwinstekgpp, [axis], measure,
+                  settle=Sweep.waitSettled([inputVoltageMeasureChannelNum, inputVoltageSetChannelNum,
+                                            outputVoltageMeasureChannelNum, outputCurrentSetChannelNum]),
+                  aborts=[Sweep.currentLimitAbort(inputVoltageSetChannelNum)],
+                  initial=[(inputVoltageSetChannelNum, "voltageSet", inputVoltageSetNominal),
+                           (outputCurrentSetChannelNum, "currentSet", outputCurrentSetNominal)],
+                  final=[(outputCurrentSetChannelNum, "currentSet", 0.0),
+                         (inputVoltageSetChannelNum, "voltageSet", 0.0)],
+                  checkpoint=checkpoint,
+                  # The input current limit and OCP stop a ramp as soon as the device under test overloads
+                  slewRates={(inputVoltageSetChannelNum, "voltageSet"): inputVoltageSlewRate,
+                             (outputCurrentSetChannelNum, "currentSet"): outputCurrentSlewRate},
+                  monitor=[inputVoltageSetChannelNum])
+    print("")
+    print(", ".join(columns))
+    for points in (sweep.run(), sweep.refine("efficiency", refinePoints, minStep)):
+        for point in points:
+            print(", ".join(f"{point[column]}" for column in columns))
+            if recorder is not None:
+                recorder.append(point)
+        if sweep.abortReason is not None:
+            print(f"ERROR {sweep.abortReason}")
+            break
+
+
+# Optionally also record the points in a .npy, .parquet or .h5 file given as first argument
+recorder = None
+if len(sys.argv) > 1:
+    recorder = Recorder(sys.argv[1], columns, {
+        "instrument": instrumentMetadata(gwinstekgpp),
+        "channels": {"inputVoltageSet": inputVoltageSetChannelNum, "inputVoltageMeasure": inputVoltageMeasureChannelNum,
+                     "outputCurrentSet": outputCurrentSetChannelNum,
+                     "outputVoltageMeasure": outputVoltageMeasureChannelNum},
+        "setpoints": {"inputVoltageSetNominal": inputVoltageSetNominal,
+                      "outputCurrentSetNominal": outputCurrentSetNominal}})
+runSweep(Axis.range(inputVoltageSetChannelNum, "voltageSet", inputVoltageSetMin, inputVoltageSetMax,
+                    inputVoltageSetStep), inputVoltageSetMinStep, recorder)
+runSweep(Axis.range(outputCurrentSetChannelNum, "currentSet", outputCurrentSetMin, outputCurrentSetMax,
+                    outputCurrentSetStep), outputCurrentSetMinStep, recorder)
+if recorder is not None:
+    recorder.close()
@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+from gwinstekgpp import Gwinstekgpp
+from fleet import Fleet
+import itertools
+import threading
+import time
+from typing import Any, Callable
+
+
+class DutPlan:
+    """The test plan of one DC-DC converter: the (input voltage, output current) points to measure in order."""
+    def __init__(self, name: str, points: list[tuple[float, float]], sense: bool = True, serial: str|None = None):
+        """@param name: The name of the device under test, unique in a Scheduler
+        @param points: The (input voltage setpoint, output current setpoint) to measure
+        @param sense: Measure the input and output voltages with 2 dedicated channels connected at the device
+        under test, instead of with the supply and load channels
+        @param serial: The serial number of the instrument to use, None for any instrument
+        """
+        if len(points) == 0:
+            raise ValueError(f"No point to measure for {name}")
+        self.name = name
+        self.points = points
+        self.sense = sense
+        self.serial = serial
+
+    @staticmethod
+    def crossSweeps(name: str, inputVoltages: list[float], outputCurrents: list[float], inputVoltageNominal: float,
+                    outputCurrentNominal: float, sense: bool = True, serial: str|None = None) -> "DutPlan":
+        """Create the plan of dcDcEfficiency.py: an input voltage sweep at the nominal output current, then an
+        output current sweep at the nominal input voltage."""
+        return DutPlan(name, [(inputVoltage, outputCurrentNominal) for inputVoltage in inputVoltages]
+                       + [(inputVoltageNominal, outputCurrent) for outputCurrent in outputCurrents], sense, serial)
+
+    @staticmethod
+    def grid(name: str, inputVoltages: list[float], outputCurrents: list[float], sense: bool = True,
+             serial: str|None = None) -> "DutPlan":
+        """Create a plan measuring all the (input voltage, output current) combinations, input voltage outermost."""
+        return DutPlan(name, list(itertools.product(inputVoltages, outputCurrents)), sense, serial)
+
+    @property
+    def roles(self) -> list[str]:
+        return Scheduler.ROLES if self.sense else Scheduler.ROLES[:2]
+
+
+class Scheduler:
+    """Characterize several DC-DC converters at the same time on the instruments of a Fleet.
+
+    Each device under test uses a load channel (CH1 or CH2 in load CC mode) for its output current, a power
+    channel for its input voltage and, with sense, 2 more channels to measure its input and output voltages.
+    All the channels of one device are on the same instrument, so an instrument tests 2 devices without sense
+    or 1 with sense.
+
+    The devices of one instrument are stepped together: the setpoints of their next point are written in one
+    batch, the settle wait is shared and they are measured in one batch. The instruments run in parallel, so
+    the total duration is the one of the longest plan instead of the sum of all of them.
+    """
+    ROLES = ["outputCurrentSet", "inputVoltageSet", "inputVoltageMeasure", "outputVoltageMeasure"]
+    COLUMNS = ["inputVoltageSet", "outputCurrentSet", "inputVoltage", "inputCurrent", "ouputVoltage", "outputCurrent",
+               "inputPower", "outputPower", "efficiency"]
+
+    def __init__(self, fleet: Fleet, plans: list[DutPlan], settle: float|None = None, settleTimeout: float = 1.0):
+        """Assign the channels of the plans.
+
+        @param settle: The duration to wait in seconds after setpoints changes, None to wait for the measures of
+        the changed devices to be settled, see Gwinstekgpp.waitSettled()
+        @param settleTimeout: The maximum settle wait in seconds of all the changed devices of an instrument, a
+        point not settled is measured anyway
+        """
+        names = [plan.name for plan in plans]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Device names are not unique: {names}")
+        self._fleet = fleet
+        self._plans = {plan.name: plan for plan in plans}
+        self._settle = settle
+        self._settleTimeout = settleTimeout
+        self._assignments = Scheduler.assign(fleet.serials, plans)
+        self._lock = threading.Lock()
+        self.abortReasons: dict[str, str] = dict()
+
+    @staticmethod
+    def assign(serials: list[str], plans: list[DutPlan]) -> dict[str, tuple[str, dict[str, int]]]:
+        """Assign an instrument and a channel to each role of each plan.
+
+        Load channels are only CH1 and CH2, supplies use CH3 and CH4 first, the sense channels the remaining ones.
+        Plans with sense are placed first since they need a full instrument.
+
+        @return: For each plan name, the serial number of its instrument and its channel for each role
+        """
+        free = {serial: [1, 2, 3, 4] for serial in serials}
+        assignments = dict()
+        for plan in sorted(plans, key=lambda plan: (plan.serial is None, not plan.sense)):
+            candidates = serials if plan.serial is None else [plan.serial]
+            for serial in candidates:
+                if serial not in free:
+                    raise ValueError(f"No instrument {serial} for {plan.name}")
+                channels = free[serial]
+                if len(channels) < len(plan.roles) or not (1 in channels or 2 in channels):
+                    continue
+                load = 1 if 1 in channels else 2
+                supply = next(channel for channel in (4, 3, 2, 1) if channel in channels and channel != load)
+                roles = {"outputCurrentSet": load, "inputVoltageSet": supply}
+                if plan.sense:
+                    roles["inputVoltageMeasure"], roles["outputVoltageMeasure"] = \
+                        [channel for channel in channels if channel not in (load, supply)]
+                for channel in roles.values():
+                    channels.remove(channel)
+                assignments[plan.name] = (serial, roles)
+                break
+            else:
+                raise ValueError(f"No free channels for {plan.name}")
+        return assignments
+
+    @property
+    def assignments(self) -> dict[str, tuple[str, dict[str, int]]]:
+        return dict(self._assignments)
+
+    @staticmethod
+    def _measureChannels(roles: dict[str, int]) -> tuple[int, int]:
+        return roles.get("inputVoltageMeasure", roles["inputVoltageSet"]), \
+            roles.get("outputVoltageMeasure", roles["outputCurrentSet"])
+
+    def preconditions(self) -> list[str]:
+        """Check the instruments state required by the plans, the same checks as dcDcEfficiency.py.
+
+        @return: The description of the failed checks, empty if all the plans can run
+        """
+        problems = []
+        for name, (serial, roles) in self._assignments.items():
+            gwinstekgpp = self._fleet.instrument(serial)
+            plan = self._plans[name]
+            inputVoltages = [inputVoltage for inputVoltage, _ in plan.points]
+            outputCurrents = [outputCurrent for _, outputCurrent in plan.points]
+
+            def check(condition: bool, message: str):
+                if not condition:
+                    problems.append(f"{name} ({serial}): {message}")
+
+            supply = gwinstekgpp.channel(roles["inputVoltageSet"])
+            check(supply.outputEnable, f"channel {roles['inputVoltageSet']} output is disabled")
+            check(supply.voltageSet == 0.0 or min(inputVoltages) <= supply.voltageSet <= max(inputVoltages),
+                  f"channel {roles['inputVoltageSet']} Vset {supply.voltageSet}V out of the plan range")
+            if roles["inputVoltageSet"] in (1, 2):
+                check(supply.ch1Ch2Mode == Gwinstekgpp.Ch1Ch2Mode.POWER_INDEPENDENT,
+                      f"channel {roles['inputVoltageSet']} is not in independent power mode")
+            load = gwinstekgpp.channel(roles["outputCurrentSet"])
+            check(load.outputEnable, f"channel {roles['outputCurrentSet']} output is disabled")
+            check(load.ch1Ch2Mode == Gwinstekgpp.Ch1Ch2Mode.LOAD_CC,
+                  f"channel {roles['outputCurrentSet']} is not in load CC mode")
+            check(load.currentSet == 0.0 or min(outputCurrents) <= load.currentSet <= max(outputCurrents),
+                  f"channel {roles['outputCurrentSet']} Iset {load.currentSet}A out of the plan range")
+            for role in ("inputVoltageMeasure", "outputVoltageMeasure"):
+                if role not in roles:
+                    continue
+                channel = gwinstekgpp.channel(roles[role])
+                if roles[role] in (1, 2):
+                    check(channel.ch1Ch2Mode == Gwinstekgpp.Ch1Ch2Mode.LOAD_CC,
+                          f"channel {roles[role]} is not in load CC mode")
+                else:
+                    check(channel.voltageSet == 0.0, f"channel {roles[role]} Vset is not 0.0V")
+                check(channel.outputEnable, f"channel {roles[role]} output is disabled")
+                check(channel.currentSet == 0.0, f"channel {roles[role]} Iset is not 0.0A")
+        return problems
+
+    @staticmethod
+    def _measure(batch: Gwinstekgpp.Batch, roles: dict[str, int]) -> Callable[[], dict[str, float]]:
+        """Record the measures of one device in batch, the returned function computes the point once executed."""
+        inputVoltageChannel, outputVoltageChannel = Scheduler._measureChannels(roles)
+        responses = [batch.channel(roles["inputVoltageSet"]).voltageSet,
+                     batch.channel(roles["outputCurrentSet"]).currentSet,
+                     batch.channel(inputVoltageChannel).voltage,
+                     batch.channel(roles["inputVoltageSet"]).current,
+                     batch.channel(outputVoltageChannel).voltage,
+                     batch.channel(roles["outputCurrentSet"]).current]
+
+        def point() -> dict[str, float]:
+            inputVoltageSet, outputCurrentSet, inputVoltage, inputCurrent, ouputVoltage, outputCurrent = \
+                [response.value for response in responses]
+            inputPower = inputVoltage * inputCurrent
+            outputPower = ouputVoltage * outputCurrent
+            efficiency = outputPower / inputPower * 100.0 if inputPower != 0.0 else 0.0
+            return {"inputVoltageSet": inputVoltageSet, "outputCurrentSet": outputCurrentSet,
+                    "inputVoltage": inputVoltage, "inputCurrent": inputCurrent, "ouputVoltage": ouputVoltage,
+                    "outputCurrent": outputCurrent, "inputPower": inputPower, "outputPower": outputPower,
+                    "efficiency": efficiency}
+        return point
+
+    @staticmethod
+    def _final(gwinstekgpp: Gwinstekgpp, rolesList: list[dict[str, int]]):
+        # Remove the loads before the supplies
+        with gwinstekgpp.batch() as batch:
+            for roles in rolesList:
+                batch.channel(roles["outputCurrentSet"]).currentSet = 0.0
+            for roles in rolesList:
+                batch.channel(roles["inputVoltageSet"]).voltageSet = 0.0
+
+    def _runInstrument(self, gwinstekgpp: Gwinstekgpp, onPoint: Callable[[str, dict[str, Any]], None]|None) \
+            -> dict[str, list[dict[str, Any]]]:
+        duts = {name: roles for name, (serial, roles) in self._assignments.items()
+                if serial == gwinstekgpp.productSerial}
+        results: dict[str, list[dict[str, Any]]] = {name: [] for name in duts}
+        previous: dict[str, tuple[float, float]] = dict()
+        active = list(duts)
+        index = 0
+        try:
+            while len(active) > 0:
+                changed = []
+                with gwinstekgpp.batch() as batch:
+                    for name in active:
+                        inputVoltage, outputCurrent = self._plans[name].points[index]
+                        lastInputVoltage, lastOutputCurrent = previous.get(name, (None, None))
+                        if inputVoltage != lastInputVoltage:
+                            batch.channel(duts[name]["inputVoltageSet"]).voltageSet = inputVoltage
+                        if outputCurrent != lastOutputCurrent:
+                            batch.channel(duts[name]["outputCurrentSet"]).currentSet = outputCurrent
+                        if (inputVoltage, outputCurrent) != (lastInputVoltage, lastOutputCurrent):
+                            changed.append(name)
+                        previous[name] = (inputVoltage, outputCurrent)
+                if self._settle is not None:
+                    time.sleep(self._settle)
+                elif len(changed) > 0:
+                    gwinstekgpp.waitSettled(sorted({channel for name in changed for channel in duts[name].values()}),
+                                            timeout=self._settleTimeout)
+                batch = gwinstekgpp.batch()
+                points = {name: Scheduler._measure(batch, duts[name]) for name in active}
+                limits = {name: batch.channel(duts[name]["inputVoltageSet"]).currentLimitState for name in active}
+                batch.execute()
+                for name in list(active):
+                    point = points[name]()
+                    results[name].append(point)
+                    if onPoint is not None:
+                        with self._lock:
+                            onPoint(name, point)
+                    if limits[name].value:
+                        with self._lock:
+                            self.abortReasons[name] = f"current limit raise in channel {duts[name]['inputVoltageSet']}"
+                        Scheduler._final(gwinstekgpp, [duts[name]])
+                        active.remove(name)
+                    elif index + 1 >= len(self._plans[name].points):
+                        Scheduler._final(gwinstekgpp, [duts[name]])
+                        active.remove(name)
+                index += 1
+        finally:
+            Scheduler._final(gwinstekgpp, list(duts.values()))
+        return results
+
+    def run(self, onPoint: Callable[[str, dict[str, Any]], None]|None = None) -> dict[str, list[dict[str, Any]]]:
+        """Check the preconditions and run all the plans.
+
+        A device reaching the current limit of its supply is stopped, abortReasons gives the reason, the others
+        go on. The load then the supply of each device are set to 0 at its end, also on exception.
+
+        @param onPoint: Called with the device name and the point, with the Scheduler.COLUMNS keys, as soon as
+        measured. Calls are serialized.
+        @return: The points measured for each device name
+        """
+        problems = self.preconditions()
+        if len(problems) > 0:
+            raise RuntimeError("Preconditions not met:\n" + "\n".join(problems))
+        self.abortReasons = dict()
+        results = dict()
+        instrumentsResults = self._fleet.run(lambda gwinstekgpp: self._runInstrument(gwinstekgpp, onPoint))
+        for instrumentResults in instrumentsResults.values():
+            results.update(instrumentResults)
+        return results
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+    from sweep import Axis
+    inputVoltages = Axis.range(4, "voltageSet", 6.0, 8.4, 0.05).values
+    outputCurrents = Axis.range(2, "currentSet", 0.0, 1.0, 0.025).values
+    with Fleet(sys.argv[1:] or sorted(glob.glob("/dev/ttyUSB*"))) as fleet:
+        plans = [DutPlan.crossSweeps(f"dut{index}", inputVoltages, outputCurrents, 8.0, 0.4, sense=False)
+                 for index in range(2 * len(fleet.serials))]
+        scheduler = Scheduler(fleet, plans)
+        for name, (serial, roles) in scheduler.assignments.items():
+            print(f"{name}: {serial} {roles}")
+        input("Press Enter to continue...")
+        print(", ".join(["dut"] + Scheduler.COLUMNS))
+        scheduler.run(lambda name, point: print(", ".join([name] + [f"{point[column]}"
+                                                                    for column in Scheduler.COLUMNS])))
+        for name, reason in scheduler.abortReasons.items():
+            print(f"ERROR {name}: {reason}")
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+from gwinstekgpp import Gwinstekgpp
+import concurrent.futures
+import time
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Fleet:
+    """Several GPP power supplies on separate serial ports, polled in parallel from a thread pool.
+
+    The instruments are identified by their serial number (productSerial), so that the results do not depend
+    on the order in which the serial ports have been enumerated.
+    """
+    def __init__(self, ports: list[str], workers: int|None = None):
+        """Open all the ports in parallel.
+
+        @param workers: The number of polling threads, by default one per instrument
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers or max(len(ports), 1),
+                                                               thread_name_prefix="Fleet")
+        self._instruments: dict[str, Gwinstekgpp] = dict()
+        self._ports: dict[str, str] = dict()
+        futures = [self._executor.submit(Fleet._open, port) for port in ports]
+        # Wait for all the ports, so that none is opened after the cleanup of a failure
+        concurrent.futures.wait(futures)
+        opened = [future.result()[0] for future in futures if future.exception() is None]
+        try:
+            for port, future in zip(ports, futures):
+                gwinstekgpp, serial = future.result()
+                if serial in self._instruments:
+                    raise ValueError(f"Same serial {serial} on {self._ports[serial]} and {port}")
+                self._instruments[serial] = gwinstekgpp
+                self._ports[serial] = port
+        except BaseException:
+            # Also unregister the opened ports, so that they can be opened again
+            for gwinstekgpp in opened:
+                gwinstekgpp.close()
+            self._executor.shutdown()
+            raise
+
+    @staticmethod
+    def _open(port: str) -> tuple[Gwinstekgpp, str]:
+        gwinstekgpp = Gwinstekgpp(port)
+        try:
+            # The identity is queried on first use, here so that the instruments are identified in parallel
+            return gwinstekgpp, gwinstekgpp.productSerial
+        except BaseException:
+            gwinstekgpp.close()
+            raise
+
+    def __enter__(self) -> "Fleet":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+        for gwinstekgpp in self._instruments.values():
+            gwinstekgpp.close()
+
+    @property
+    def serials(self) -> list[str]:
+        return list(self._instruments)
+
+    def instrument(self, serial: str) -> Gwinstekgpp:
+        return self._instruments[serial]
+
+    def port(self, serial: str) -> str:
+        return self._ports[serial]
+
+    def run(self, function: Callable[[Gwinstekgpp], T]) -> dict[str, T]:
+        """Call function on all the instruments in parallel and return the results by serial number.
+
+        The total duration is the one of the slowest instrument instead of the sum of all of them.
+        """
+        futures = {serial: self._executor.submit(function, gwinstekgpp)
+                   for serial, gwinstekgpp in self._instruments.items()}
+        return {serial: future.result() for serial, future in futures.items()}
+
+    @staticmethod
+    def _snapshot(gwinstekgpp: Gwinstekgpp) -> dict[str, Any]:
+        batch = gwinstekgpp.batch()
+        for measureType in (Gwinstekgpp.MeasureType.VOLTAGE, Gwinstekgpp.MeasureType.CURRENT,
+                            Gwinstekgpp.MeasureType.POWER):
+            batch.measureAll(measureType)
+        start = time.monotonic()
+        voltage, current, power = batch.execute()
+        end = time.monotonic()
+        return {"time": (start + end) / 2, "voltage": voltage, "current": current, "power": power}
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Measure the voltage, current and power of all the channels of all the instruments.
+
+        All instruments are polled at the same time, with one round trip each. The result gives for each
+        serial number the time (time.monotonic at the middle of the round trip) and the lists of the 4
+        channels voltages, currents and powers.
+        """
+        return self.run(Fleet._snapshot)
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+    with Fleet(sys.argv[1:] or sorted(glob.glob("/dev/ttyUSB*"))) as fleet:
+        for serial, measures in fleet.snapshot().items():
+            print(f"{serial} ({fleet.port(serial)}): voltage={measures['voltage']} current={measures['current']}")
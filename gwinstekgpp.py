@@ -1,7 +1,19 @@
 #!/usr/bin/python3
 import serial
 import enum
+import json
+import math
+import os
 import time
+import asyncio
+import threading
+import queue
+import select
+import concurrent.futures
+from typing import Any, Awaitable, Callable, TypeVar
+
+
+T = TypeVar("T")
 
 
 class Gwinstekgpp:
@@ -24,6 +36,13 @@ class Gwinstekgpp:
                 return self.name[0:3]
             return self.name[0:4]
 
+        def _toCacheName(self) -> str:
+            if self == Gwinstekgpp.SourceType.VOLTAGE:
+                return "voltageSet"
+            elif self == Gwinstekgpp.SourceType.CURRENT:
+                return "currentSet"
+            return "resistanceSet"
+
     class Ch1Ch2Mode(enum.Enum):
         POWER_INDEPENDENT = 1
         POWER_SERIES = 2
@@ -50,225 +69,634 @@ class Gwinstekgpp:
                 raise ValueError(f"Receive an unexpected CH1/CH2 mode {mode}")
 
     class Channel:
+        # Many channels are created by batches and views, and a typo in a setter name raises instead of
+        # silently adding an attribute
+        __slots__ = ("_gwinstekgpp", "_channel")
+
         def __init__(self, gwinstekgpp: "Gwinstekgpp", channel: int):
             self._gwinstekgpp = gwinstekgpp
             self._channel = channel
 
+        def _cachedQuery(self, name: str, command: str, parser: Callable[[bytes], T]) -> T:
+            return self._gwinstekgpp._cachedQuery((self._channel, name), command, parser)
+
+        def _cachedWrite(self, name: str, command: str, value):
+            self._gwinstekgpp._cachedWrite((self._channel, name), command, value)
+
         def measure(self, measureType: "Gwinstekgpp.MeasureType") -> float|list[float]:
             """Return the given measure.
             When select ALL measure type return a list of 3 floats with first Voltage, second current
             and last power
             """
-            self._gwinstekgpp._serial.write(f":MEAS{self._channel}:{measureType.toSerialStr()}?\r".encode())
-            response = self._gwinstekgpp._serial.readline().strip()
             if measureType == Gwinstekgpp.MeasureType.ALL:
-                return [float(x) for x in response.split(b',')]
-            return float(response)
+                parser = Gwinstekgpp._parseFloatList
+            else:
+                parser = float
+            return self._gwinstekgpp._query(f":MEAS{self._channel}:{measureType.toSerialStr()}?", parser)
+
+        def measureInto(self, out, offset: int = 0):
+            """Write the voltage, current and power in out[offset:offset + 3].
+
+            Unlike measure() no list of values is returned, out can be an array.array("d"), a NumPy array or any
+            writable sequence, to log at high rate.
+            """
+            self._gwinstekgpp._queryInto(f":MEAS{self._channel}:ALL?", out, offset, 3)
+
+        def waitSettled(self, voltageTolerance: float = 0.01, currentTolerance: float = 0.005, samples: int = 3,
+                        timeout: float = 1.0) -> bool:
+            """Wait until the measured voltage and current stay in the tolerance band.
+
+            Measures are polled as fast as possible, and the band is centered on the first measure of the
+            consecutive samples.
+
+            @param voltageTolerance: The maximum voltage variation in V
+            @param currentTolerance: The maximum current variation in A, well above the 1 mA measure resolution
+            so that the noise of a converter input does not prevent the settle
+            @param samples: The number of consecutive measures which must be in the band
+            @param timeout: The maximum waiting duration in seconds
+            @return: True if settled, False if the timeout expired before
+            """
+            measures = [0.0] * 3
+            return Gwinstekgpp._waitStable(lambda: self.measureInto(measures), measures,
+                                           [(0, voltageTolerance), (1, currentTolerance)], samples, timeout)
+
+        def ramp(self, setpoint: str, target: float, slewRate: float|None = None, steps: int|None = None,
+                 interval: float = 0.05, monitor: list[int]|None = None) -> str|None:
+            """Move a setpoint to target by steps instead of a single jump.
+
+            Each step writes the next value and reads the state of the monitored channels in the same round
+            trip, so the ramp stops as soon as a current limit is reached or a protection disables an output.
+            A current limit or a disabled output already present at the start is ignored, to ramp out of it.
+            Steps are timed on absolute deadlines, so the link latency does not slow the ramp down.
+
+            @param setpoint: "voltageSet" or "currentSet"
+            @param slewRate: The maximum rate of change in V/s or A/s
+            @param steps: The number of steps, by default enough steps to write one every interval
+            @param interval: The duration between steps in seconds when not computed from slewRate and steps
+            @param monitor: The channels checked at each step, by default this channel, [] to never stop, for
+            exemple to ramp back to a safe state
+            @return: None once the target is reached, else the reason of the stop, the setpoint is then left
+            at the last step written
+            """
+            if setpoint not in ("voltageSet", "currentSet"):
+                raise ValueError(f"Invalid ramp setpoint {setpoint}")
+            if slewRate is None and steps is None:
+                raise ValueError("Ramp needs a slew rate or a number of steps")
+            if (slewRate is not None and slewRate <= 0.0) or (steps is not None and steps < 1):
+                raise ValueError(f"Invalid ramp slew rate {slewRate} or steps {steps}")
+            if monitor is None:
+                monitor = [self._channel]
+            batch = self._gwinstekgpp.batch()
+            getattr(batch.channel(self._channel), setpoint)
+            for channel in monitor:
+                batch.channel(channel).currentLimitState
+                batch.channel(channel).outputEnable
+            start, *states = batch.execute()
+            # Only a change during the ramp is a stop reason, so that a ramp can leave a faulty state
+            limited = [channel for channel, currentLimit in zip(monitor, states[0::2]) if not currentLimit]
+            watched = [channel for channel, outputEnable in zip(monitor, states[1::2]) if outputEnable]
+            delta = target - start
+            if slewRate is not None:
+                duration = abs(delta) / slewRate
+                if steps is None:
+                    steps = max(math.ceil(duration / interval - 1e-9), 1)
+                interval = duration / steps
+            deadline = time.monotonic()
+            for step in range(1, steps + 1):
+                # Each step is written at the end of its interval so that the slew rate is never exceeded
+                deadline += interval
+                time.sleep(max(deadline - time.monotonic(), 0.0))
+                # Computed from the index so that rounding errors do not accumulate
+                value = target if step == steps else start + delta * step / steps
+                setattr(batch.channel(self._channel), setpoint, value)
+                for channel in limited:
+                    batch.channel(channel).currentLimitState
+                for channel in watched:
+                    batch.channel(channel).outputEnable
+                states = batch.execute()
+                for channel, currentLimit in zip(limited, states):
+                    if currentLimit:
+                        return f"current limit raise in channel {channel} at {setpoint} {value}"
+                for channel, outputEnable in zip(watched, states[len(limited):]):
+                    if not outputEnable:
+                        # The cached output state is the one before the protection
+                        self._gwinstekgpp.invalidateCache(channel)
+                        return f"output of channel {channel} disabled by a protection at {setpoint} {value}"
+            return None
 
         @property
         def voltage(self) -> float:
             """Returns the actual output voltage."""
-            self._gwinstekgpp._serial.write(f"VOUT{self._channel}?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip().removesuffix(b"V"))
+            return self._gwinstekgpp._query(f"VOUT{self._channel}?", lambda response: float(response.removesuffix(b"V")))
 
         @property
         def current(self) -> float:
             """Returns the actual output current."""
-            self._gwinstekgpp._serial.write(f"IOUT{self._channel}?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip().removesuffix(b"A"))
+            return self._gwinstekgpp._query(f"IOUT{self._channel}?", lambda response: float(response.removesuffix(b"A")))
 
         @property
         def outputEnable(self) -> bool:
             """Get the actual output state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:STAT?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._cachedQuery("outputEnable", f":OUTP{self._channel}:STAT?", Gwinstekgpp._parseState)
 
         @outputEnable.setter
         def outputEnable(self, value: bool):
             """Enable or disable the actual output state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:STAT {"1" if value else "0"}\r".encode())
+            self._cachedWrite("outputEnable", f":OUTP{self._channel}:STAT {"1" if value else "0"}", bool(value))
 
         @property
         def ovpEnable(self) -> bool:
             """Get the actual output over voltage protection state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OVP:STAT?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._cachedQuery("ovpEnable", f":OUTP{self._channel}:OVP:STAT?", Gwinstekgpp._parseState)
 
         @ovpEnable.setter
         def ovpEnable(self, value: bool):
             """Enable or disable the actual output over voltage protection state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OVP:STAT {"1" if value else "0"}\r".encode())
+            self._cachedWrite("ovpEnable", f":OUTP{self._channel}:OVP:STAT {"1" if value else "0"}", bool(value))
 
         @property
         def ovpValue(self) -> float:
             """Get the actual output over voltage protection value."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OVP?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip())
+            return self._cachedQuery("ovpValue", f":OUTP{self._channel}:OVP?", float)
 
         @ovpValue.setter
         def ovpValue(self, value: float):
             """Set the actual output over voltage protection value."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OVP {value}\r".encode())
+            self._cachedWrite("ovpValue", f":OUTP{self._channel}:OVP {value}", float(value))
 
         @property
         def ocpEnable(self) -> bool:
             """Get the actual output over current protection state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OCP:STAT?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._cachedQuery("ocpEnable", f":OUTP{self._channel}:OCP:STAT?", Gwinstekgpp._parseState)
 
         @ocpEnable.setter
         def ocpEnable(self, value: bool):
             """Enable or disable the actual output over current protection state."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OCP:STAT {"1" if value else "0"}\r".encode())
+            self._cachedWrite("ocpEnable", f":OUTP{self._channel}:OCP:STAT {"1" if value else "0"}", bool(value))
 
         @property
         def ocpValue(self) -> float:
             """Get the actual output over current protection value."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OCP?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip())
+            return self._cachedQuery("ocpValue", f":OUTP{self._channel}:OCP?", float)
 
         @ocpValue.setter
         def ocpValue(self, value: float):
             """Set the actual output over current protection value."""
-            self._gwinstekgpp._serial.write(f":OUTP{self._channel}:OCP {value}\r".encode())
+            self._cachedWrite("ocpValue", f":OUTP{self._channel}:OCP {value}", float(value))
 
         def setSource(self, sourceType: "Gwinstekgpp.SourceType", value: float):
             """Set the actual voltage or current target"""
-            self._gwinstekgpp._serial.write(f":SOUR{self._channel}:{sourceType.toSerialStr()} {value}\r".encode())
+            self._cachedWrite(sourceType._toCacheName(), f":SOUR{self._channel}:{sourceType.toSerialStr()} {value}",
+                              float(value))
 
         def getSource(self, sourceType: "Gwinstekgpp.SourceType") -> float:
             """Get the actual voltage or current target"""
-            self._gwinstekgpp._serial.write(f":SOUR{self._channel}:{sourceType.toSerialStr()}?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip())
+            return self._cachedQuery(sourceType._toCacheName(), f":SOUR{self._channel}:{sourceType.toSerialStr()}?",
+                                     float)
 
         @property
         def currentLimitState(self) -> bool:
             """Return true if the current limit has been reached"""
-            self._gwinstekgpp._serial.write(f":SOUR{self._channel}:CURR:STAT?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"1"
+            # A protection may have disabled the output at the same time
+            self._gwinstekgpp._dropCached((self._channel, "outputEnable"))
+            return self._gwinstekgpp._query(f":SOUR{self._channel}:CURR:STAT?", Gwinstekgpp._parseFlag)
 
         @property
         def voltageSet(self) -> float:
             """Return the actual voltage target (vset)."""
-            self._gwinstekgpp._serial.write(f"VSET{self._channel}?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip().removesuffix(b"V"))
+            return self._cachedQuery("voltageSet", f"VSET{self._channel}?",
+                                     lambda response: float(response.removesuffix(b"V")))
 
         @voltageSet.setter
         def voltageSet(self, value: float):
             """Set the actual voltage target (vset)."""
-            self._gwinstekgpp._serial.write(f"VSET{self._channel}:{value}\r".encode())
+            self._cachedWrite("voltageSet", f"VSET{self._channel}:{value}", float(value))
 
         @property
         def currentSet(self) -> float:
             """Return the actual current target (iset)."""
-            self._gwinstekgpp._serial.write(f"ISET{self._channel}?\r".encode())
-            return float(self._gwinstekgpp._serial.readline().strip().removesuffix(b"V"))
+            return self._cachedQuery("currentSet", f"ISET{self._channel}?",
+                                     lambda response: float(response.removesuffix(b"A")))
 
         @currentSet.setter
         def currentSet(self, value: float):
             """Set the actual current target (iset)."""
-            self._gwinstekgpp._serial.write(f"ISET{self._channel}:{value}\r".encode())
+            self._cachedWrite("currentSet", f"ISET{self._channel}:{value}", float(value))
 
         @property
         def ch1Ch2Mode(self) -> "Gwinstekgpp.Ch1Ch2Mode":
             """Return the actual CH1/CH2 mode"""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"CH1/CH2 mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f"MODE{self._channel}?\r".encode())
-            return Gwinstekgpp.Ch1Ch2Mode.fromSerialStr(self._gwinstekgpp._serial.readline().strip().decode())
+            return self._cachedQuery("ch1Ch2Mode", f"MODE{self._channel}?",
+                                     lambda response: Gwinstekgpp.Ch1Ch2Mode.fromSerialStr(response.decode()))
 
         @property
         def loadCvEnable(self) -> bool:
             """Get the actual load mode in constant voltage mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CV?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._gwinstekgpp._query(f":LOAD{self._channel}:CV?", Gwinstekgpp._parseState)
 
         @loadCvEnable.setter
         def loadCvEnable(self, value: bool):
             """Enable or disable the actual load mode in constant voltage mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CV {"ON" if value else "OFF"}\r".encode())
+            self._gwinstekgpp._write(f":LOAD{self._channel}:CV {"ON" if value else "OFF"}")
+            # Also change the CH1/CH2 mode and the other load modes
+            self._gwinstekgpp.invalidateCache(self._channel)
 
         @property
         def loadCcEnable(self) -> bool:
             """Get the actual load mode in constant current mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CC?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._gwinstekgpp._query(f":LOAD{self._channel}:CC?", Gwinstekgpp._parseState)
 
         @loadCcEnable.setter
         def loadCcEnable(self, value: bool):
             """Enable or disable the actual load mode in constant current mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CC {"ON" if value else "OFF"}\r".encode())
+            self._gwinstekgpp._write(f":LOAD{self._channel}:CC {"ON" if value else "OFF"}")
+            # Also change the CH1/CH2 mode and the other load modes
+            self._gwinstekgpp.invalidateCache(self._channel)
 
         @property
         def loadCrEnable(self) -> bool:
             """Get the actual load mode in constant resistance mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CR?\r".encode())
-            return self._gwinstekgpp._serial.readline().strip() == b"ON"
+            return self._gwinstekgpp._query(f":LOAD{self._channel}:CR?", Gwinstekgpp._parseState)
 
         @loadCrEnable.setter
         def loadCrEnable(self, value: bool):
             """Enable or disable the actual load mode in constant resistance mode."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:CR {"ON" if value else "OFF"}\r".encode())
+            self._gwinstekgpp._write(f":LOAD{self._channel}:CR {"ON" if value else "OFF"}")
+            # Also change the CH1/CH2 mode and the other load modes
+            self._gwinstekgpp.invalidateCache(self._channel)
 
         @property
         def resistanceSet(self) -> int:
             """Return the actual resistance target (Rset)."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:RES?\r".encode())
-            return int(self._gwinstekgpp._serial.readline().strip())
+            return self._cachedQuery("resistanceSet", f":LOAD{self._channel}:RES?", int)
 
         @resistanceSet.setter
         def resistanceSet(self, value: int):
             """Set the actual resistance target (Rset)."""
             if self._channel != 1 and self._channel != 2:
                 raise ValueError(f"Load mode not available for channel {self._channel}")
-            self._gwinstekgpp._serial.write(f":LOAD{self._channel}:RES {value}\r".encode())
+            self._cachedWrite("resistanceSet", f":LOAD{self._channel}:RES {value}", int(value))
+
+    class Response:
+        """The deferred response of a query recorded in a Gwinstekgpp.Batch."""
+        def __init__(self, parser: Callable[[bytes], Any]):
+            self._parser = parser
+            self._done = False
+            self._value = None
+
+        def _set(self, value):
+            self._value = value
+            self._done = True
+
+        @property
+        def done(self) -> bool:
+            """True when the response has been received."""
+            return self._done
+
+        @property
+        def value(self):
+            """The parsed response, only available once the batch has been executed."""
+            if not self._done:
+                raise RuntimeError("Response not yet received, execute the batch first")
+            return self._value
+
+    class _View:
+        """Base of the objects giving the Gwinstekgpp channels API on top of another _write/_query."""
+        def __init__(self, gwinstekgpp: "Gwinstekgpp"):
+            self._gwinstekgpp = gwinstekgpp
+            self._channels: dict[int, Gwinstekgpp.Channel] = dict()
+
+        def channel(self, channel: int) -> "Gwinstekgpp.Channel":
+            return Gwinstekgpp._lazyChannel(self, channel)
+
+        # Only _write and _query are used by these Gwinstekgpp methods, so they can be reused as is
+        def measureAll(self, measureType: "Gwinstekgpp.MeasureType"):
+            return Gwinstekgpp.measureAll(self, measureType)
+
+        def sourceAll(self, sourceType: "Gwinstekgpp.SourceType"):
+            return Gwinstekgpp.sourceAll(self, sourceType)
+
+        def setOutputStateAll(self, value: bool):
+            Gwinstekgpp.setOutputStateAll(self, value)
+
+        def invalidateCache(self, channel: int|None = None):
+            Gwinstekgpp.invalidateCache(self._gwinstekgpp, channel)
+
+        def _cachedQuery(self, key: tuple[int, str], command: str, parser: Callable[[bytes], Any]):
+            # Always sent, the value is not available yet to be cached
+            return self._query(command, parser)
+
+        def _cachedWrite(self, key: tuple[int, str], command: str, value):
+            self._write(command)
+            if self._gwinstekgpp._cache is not None:
+                self._gwinstekgpp._cache.pop(key, None)
+                self._gwinstekgpp._dropDependents(key)
+
+        def _dropCached(self, key: tuple[int, str]):
+            Gwinstekgpp._dropCached(self._gwinstekgpp, key)
+
+    class Batch(_View):
+        """Record several commands and send them in one write separated by ';'.
+
+        The channels of a batch have the same API as Gwinstekgpp.Channel, but setters are only recorded
+        and getters return a Gwinstekgpp.Response filled by execute(). Can be used as a context manager
+        to execute the batch on exit.
+        """
+        def __init__(self, gwinstekgpp: "Gwinstekgpp"):
+            super().__init__(gwinstekgpp)
+            self._commands: list[str] = []
+            self._responses: list[Gwinstekgpp.Response] = []
+
+        def __enter__(self) -> "Gwinstekgpp.Batch":
+            return self
+
+        def __exit__(self, excType, excValue, traceback):
+            if excType is None:
+                self.execute()
+
+        def _write(self, command: str):
+            self._commands.append(command)
+
+        def _query(self, command: str, parser: Callable[[bytes], Any]) -> "Gwinstekgpp.Response":
+            self._commands.append(command)
+            response = Gwinstekgpp.Response(parser)
+            self._responses.append(response)
+            return response
+
+        def execute(self) -> list:
+            """Send all the recorded commands in one round trip.
+
+            @return: The parsed values of all the recorded queries, in the recording order
+            """
+            commands, responses = self._commands, self._responses
+            self._commands, self._responses = [], []
+            if len(commands) == 0:
+                return []
+            values = self._gwinstekgpp._queryBatch(commands, [response._parser for response in responses])
+            for response, value in zip(responses, values):
+                response._set(value)
+            return values
+
+    class Pipeline(_View):
+        """Send commands back to back without waiting for the previous responses.
+
+        The channels of a pipeline have the same API as Gwinstekgpp.Channel, but getters return a
+        concurrent.futures.Future resolved by the pipeline reader thread. Gwinstekgpp.startPipeline()
+        must be called first.
+        """
+        def _write(self, command: str):
+            self._gwinstekgpp._write(command)
+
+        def _query(self, command: str, parser: Callable[[bytes], T]) -> concurrent.futures.Future:
+            return self._gwinstekgpp._submit(command, [parser], True)
 
-    def __init__(self, port: str):
+    class Tracer:
+        """Receive the transport events, subclass it to export them, for exemple to a metrics system.
+
+        Set it with the Gwinstekgpp tracer property. The methods are called from the thread which read the
+        response, the pipeline reader thread in pipelined mode.
+        """
+        def command(self, command: str, bytesOut: int, bytesIn: int, duration: float, error: Exception|None):
+            """Called after each write, possibly compound, and the read of its responses.
+
+            @param bytesIn: The number of response bytes, end of lines included
+            @param duration: The duration in seconds from the write to the last response parsed, including the
+            wait behind the previous commands in pipelined mode
+            @param error: The exception raised by the write or the read, None on success
+            """
+
+        def instrumentError(self, message: str):
+            """Called when err() returns an error from the instrument error queue."""
+
+    class ResponseError(ValueError):
+        """A response which does not match its query, the responses stream is out of sync."""
+
+    class InstrumentError(RuntimeError):
+        """An error returned by the instrument error queue after a checked write."""
+
+    # Maximum number of errors read to empty the instrument error queue
+    _ERROR_QUEUE_SIZE = 32
+    # UART baud rates selectable on the instrument front panel, fastest first
+    BAUDRATES = (115200, 57600, 38400, 19200, 9600)
+    # The baud rate detected for each port real path
+    BAUDRATE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "gwinstekgpp", "baudrates.json")
+    _baudratesLock = threading.Lock()
+
+    # The open connections by port real path, shared by all the Gwinstekgpp created on the same port
+    _registry: dict[str, "Gwinstekgpp"] = dict()
+    _registryLock = threading.Lock()
+
+    def __new__(cls, port: str, *args, **kwargs) -> "Gwinstekgpp":
+        with Gwinstekgpp._registryLock:
+            gwinstekgpp = Gwinstekgpp._registry.get(os.path.realpath(port))
+            if gwinstekgpp is not None:
+                gwinstekgpp._references += 1
+                return gwinstekgpp
+        return super().__new__(cls)
+
+    def __init__(self, port: str, baudrate: int|None = None, timeout: float|None = 1.0, retries: int = 2,
+                 checkedWrites: bool = False):
         """Create a serial connection with a GW instek GPP power supply.
         
         @param port: The serial port to use, for exemple on Linux /dev/ttyUSB0
+        @param baudrate: The baud rate configured on the instrument, None to use the one detected for this port
+        during a previous run, or else to probe the fastest one that answers
+        @param timeout: The maximum duration in seconds to wait for a response, None to wait forever
+        @param retries: The number of times an idempotent command is sent again after a timeout or an invalid
+        response
+        @param checkedWrites: Check the instrument error queue after each setter, see checkedWrites
+
+        A port already open in the process is reused: the same Gwinstekgpp is returned, it must be created with
+        the same parameters, and the port is only closed by the last close(). With a baud rate given or cached by
+        a previous run, the port is opened without any query: the identity is only queried when first used, and
+        a cached baud rate is only detected again if the instrument does not answer the first command.
         """
-        self._serial = serial.Serial(port=port, baudrate=9600, bytesize=8, parity=serial.PARITY_NONE, stopbits=1)
-        self._serial.write(b"*IDN?\r")
-        response = self._serial.readline()
-        self._productBrand, self._productModel, self._productSerial, self._firmwareVersion = response.strip().split(b',')
+        if "_serial" in self.__dict__:
+            # Reused from the registry by __new__
+            mismatches = [f"{name} {current} instead of {value}" for name, current, value in [
+                ("baudrate", self._serial.baudrate, baudrate if baudrate is not None else self._serial.baudrate),
+                ("timeout", self.timeout, timeout), ("retries", self.retries, retries),
+                ("checkedWrites", self.checkedWrites, checkedWrites)] if current != value]
+            if len(mismatches) > 0:
+                self.close()
+                raise ValueError(f"{port} already open with {', '.join(mismatches)}")
+            return
+        self._identity: list[bytes]|None = None
+        # Opened at a cached baud rate which may have been changed on the instrument since
+        self._baudrateUnconfirmed = False
+        if baudrate is None:
+            baudrate = Gwinstekgpp._loadBaudrates().get(os.path.realpath(port))
+            self._baudrateUnconfirmed = baudrate is not None
+        if baudrate is None:
+            self._serial, self._identity = Gwinstekgpp._openDetected(port)
+        else:
+            self._serial = serial.Serial(port=port, baudrate=baudrate, bytesize=8, parity=serial.PARITY_NONE,
+                                         stopbits=1)
+        self._serial.timeout = timeout
+        self._serial.write_timeout = timeout
+        self.retries = retries
+        self._checkedWrites = False
+        # Reentrant as resync() is also called during a transaction
+        self._transactionLock = threading.RLock()
+        self._pipelineLock = threading.Lock()
+        self._pipelinePending: queue.Queue = queue.Queue()
+        self._pipelineReader: threading.Thread|None = None
+        # The first failure of the pipeline, once set the responses can belong to other queries
+        self._pipelineFailure: Exception|None = None
+        self._cache: dict[tuple[int, str], tuple[float, Any]]|None = None
+        self._cacheTtl: float|None = None
+        # The bytes received and not yet read are _receiveBuffer[_receivedStart:_receivedEnd]
+        self._receiveBuffer = bytearray(4096)
+        self._receiveView = memoryview(self._receiveBuffer)
+        self._receivedStart = 0
+        self._receivedEnd = 0
+        self._consumed = 0
+        self._tracer: Gwinstekgpp.Tracer|None = None
         self._channels: dict[int, Gwinstekgpp.Channel] = dict()
-        for channel in range(1, 5):
-            self._channels[channel] = Gwinstekgpp.Channel(self, channel)
+        self._registryKey = os.path.realpath(port)
+        try:
+            self.checkedWrites = checkedWrites
+        except Exception:
+            self._serial.close()
+            raise
+        with Gwinstekgpp._registryLock:
+            self._references = 1
+            Gwinstekgpp._registry[self._registryKey] = self
+
+    @staticmethod
+    def _loadBaudrates() -> dict[str, int]:
+        try:
+            with open(Gwinstekgpp.BAUDRATE_CACHE) as cacheFile:
+                return json.load(cacheFile)
+        except (OSError, ValueError):
+            return dict()
+
+    @staticmethod
+    def _saveBaudrate(port: str, baudrate: int):
+        # Ports are detected in parallel by a Fleet, each update must keep the entries written by the others
+        with Gwinstekgpp._baudratesLock:
+            baudrates = Gwinstekgpp._loadBaudrates()
+            if baudrates.get(os.path.realpath(port)) == baudrate:
+                return
+            baudrates[os.path.realpath(port)] = baudrate
+            # Written aside then renamed, so that an interruption never leaves a truncated file
+            temporary = f"{Gwinstekgpp.BAUDRATE_CACHE}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(Gwinstekgpp.BAUDRATE_CACHE), exist_ok=True)
+                with open(temporary, "w") as cacheFile:
+                    json.dump(baudrates, cacheFile, indent=2)
+                os.replace(temporary, Gwinstekgpp.BAUDRATE_CACHE)
+            except OSError:
+                # Only an optimization of the next startup
+                pass
+
+    @staticmethod
+    def _openDetected(port: str, probeTimeout: float = 0.3) -> tuple[serial.Serial, list[bytes]]:
+        """Open the port at the baud rate on which the instrument answers to *IDN?.
+
+        The baud rate cached for this port is tried first, then all BAUDRATES from the fastest. The error queue
+        is then emptied of the errors caused by the probes.
+
+        @return: The open port and the identity fields received
+        """
+        cached = Gwinstekgpp._loadBaudrates().get(os.path.realpath(port))
+        candidates = ([cached] if cached is not None else []) + [baudrate for baudrate in Gwinstekgpp.BAUDRATES
+                                                                 if baudrate != cached]
+        serialPort = serial.Serial(port=port, baudrate=candidates[0], bytesize=8, parity=serial.PARITY_NONE,
+                                   stopbits=1, timeout=probeTimeout)
+        for baudrate in candidates:
+            serialPort.baudrate = baudrate
+            serialPort.reset_input_buffer()
+            # The first end of line terminates the garbage received at a previous wrong baud rate
+            serialPort.write(b"\r*IDN?\r")
+            response = serialPort.readline().strip()
+            if len(response.split(b',')) == 4:
+                Gwinstekgpp._saveBaudrate(port, baudrate)
+                # The garbage received at the wrong baud rates is queued as errors
+                for _ in range(Gwinstekgpp._ERROR_QUEUE_SIZE):
+                    serialPort.write(b":SYST:ERR?\r")
+                    message = serialPort.readline().strip().decode(errors="replace")
+                    if len(message) == 0 or not Gwinstekgpp._isError(message):
+                        break
+                return serialPort, response.split(b',')
+        serialPort.close()
+        raise ConnectionError(f"No GPP answering on {port} at baud rates {candidates}")
+
+    @property
+    def baudrate(self) -> int:
+        return self._serial.baudrate
+
+    def _detectBaudrate(self):
+        """Open the port again at the baud rate on which the instrument answers."""
+        self._baudrateUnconfirmed = False
+        timeout = self._serial.timeout
+        self._serial.close()
+        self._serial, self._identity = Gwinstekgpp._openDetected(self._serial.port)
+        self._serial.timeout = timeout
+        self._serial.write_timeout = timeout
+        self._receivedStart = self._receivedEnd = 0
+
+    def _confirmBaudrate(self):
+        """Check the cached baud rate before a command without response, a query detects it again if needed."""
+        if self._baudrateUnconfirmed:
+            self._query("*OPC?", bytes)
+
+    def close(self):
+        """Close the serial connection, after the pending pipelined responses if any.
+
+        When the port is shared by several Gwinstekgpp creations, only the last close() closes it.
+        """
+        with Gwinstekgpp._registryLock:
+            if self._references == 0:
+                return
+            self._references -= 1
+            if self._references > 0:
+                return
+            if Gwinstekgpp._registry.get(self._registryKey) is self:
+                del Gwinstekgpp._registry[self._registryKey]
+        self.stopPipeline()
+        self._serial.close()
+
+    def _identityField(self, index: int) -> str:
+        if self._identity is None:
+            self._identity = self._query("*IDN?", Gwinstekgpp._parseIdentity)
+        return self._identity[index].decode()
 
     @property
     def productBrand(self) -> str:
         """The product brand, for exemple "GW Instek" """
-        return self._productBrand.decode()
+        return self._identityField(0)
     
     @property
     def productModel(self) -> str:
         """The product model, for exemple "GPP-4323" """
-        return self._productModel.decode()
+        return self._identityField(1)
 
     @property
     def productSerial(self) -> str:
         """The product serial, for exemple "SN:AAA000000" """
-        return self._productSerial.decode()
+        return self._identityField(2)
 
     @property
     def firmwareVersion(self) -> str:
         """The firmware version, for exemple "V1.22" """
-        return self._firmwareVersion.decode()
+        return self._identityField(3)
 
     @staticmethod
     def _channelCheck(channel: int):
@@ -277,28 +705,571 @@ class Gwinstekgpp:
         if channel<1 or 4<channel:
             raise ValueError(f"Invalid channel value {channel}")
 
-    def channel(self, channel:int) -> Channel:
+    @staticmethod
+    def _lazyChannel(owner: "Gwinstekgpp|Gwinstekgpp._View", channel: int) -> Channel:
         Gwinstekgpp._channelCheck(channel)
-        return self._channels[channel]
+        channelObject = owner._channels.get(channel)
+        if channelObject is None:
+            # Created on first use, most scripts only use some channels
+            channelObject = owner._channels[channel] = Gwinstekgpp.Channel(owner, channel)
+        return channelObject
+
+    def channel(self, channel:int) -> Channel:
+        return Gwinstekgpp._lazyChannel(self, channel)
+
+    @property
+    def timeout(self) -> float|None:
+        return self._serial.timeout
+
+    @timeout.setter
+    def timeout(self, value: float|None):
+        """Set the maximum duration in seconds to wait for a response, None to wait forever.
+
+        A query without response in time raises TimeoutError. In the request/response mode the responses
+        stream is then resynchronized and idempotent queries are sent again. In pipelined mode the future
+        of the query fails, as well as all the queued and next ones since a late response would be given to
+        the next query, call stopPipeline() then resync() to go on.
+        """
+        self._serial.timeout = value
+        self._serial.write_timeout = value
+
+    @property
+    def retries(self) -> int:
+        return self._retries
+
+    @retries.setter
+    def retries(self, value: int):
+        """Set the number of times an idempotent command is sent again after a timeout or an invalid response."""
+        if value < 0:
+            raise ValueError(f"Invalid retries value {value}")
+        self._retries = value
+
+    @property
+    def checkedWrites(self) -> bool:
+        return self._checkedWrites
+
+    @checkedWrites.setter
+    def checkedWrites(self, value: bool):
+        """Enable or disable the check of the setters.
+
+        When enabled, each setter is sent with :SYST:ERR? in the same write and raises
+        Gwinstekgpp.InstrumentError if the instrument reports an error. Setters then wait for the instrument
+        instead of being only buffered. The errors already queued, for exemple by unchecked writes, are read
+        and dropped when enabled, so that they are not reported against the next setter.
+        """
+        if value and not self._checkedWrites:
+            self._clearErrors()
+        self._checkedWrites = value
+
+    def resync(self, quietTime: float = 0.05):
+        """Drop the responses not yet read and wait until the instrument has executed all the commands received.
+
+        The input is drained until nothing is received during quietTime seconds, then *OPC? is sent and the
+        lines received are skipped until its response.
+        """
+        if self._pipelineReader is not None:
+            raise RuntimeError("Cannot resync in pipelined mode, call stopPipeline() first")
+        with self._transactionLock:
+            timeout = self._serial.timeout
+            self._serial.timeout = quietTime
+            try:
+                while len(self._serial.read(max(1, self._serial.in_waiting))) > 0:
+                    pass
+            finally:
+                self._serial.timeout = timeout
+            self._receivedStart = self._receivedEnd = 0
+            # The first end of line terminates a partially received command
+            self._serial.write(b"\r*OPC?\r")
+            while self._readLine() != b"1":
+                pass
+            self._pipelineFailure = None
+
+    @staticmethod
+    def _idempotent(command: str) -> bool:
+        # Reading the error queue removes the error read
+        return ":SYST:ERR?" not in command
+
+    def _transact(self, command: str, read: Callable[[], T]) -> T:
+        """Send a command and read its responses in the request/response mode.
+
+        On a timeout or an invalid response the responses stream is resynchronized, and the command is sent
+        again up to retries times if it is idempotent. Transactions of several threads are serialized, so that
+        for exemple an Acquisition thread and the main thread can share the same Gwinstekgpp.
+        """
+        with self._transactionLock:
+            if self._baudrateUnconfirmed:
+                self._baudrateUnconfirmed = False
+                try:
+                    return self._exchange(command, read)
+                except (TimeoutError, Gwinstekgpp.ResponseError):
+                    self._detectBaudrate()
+            if self._receivedEnd > self._receivedStart or self._serial.in_waiting > 0:
+                # Responses not read, for exemple received after their timeout, would be taken for these ones
+                self.resync()
+            attempts = self._retries + 1 if Gwinstekgpp._idempotent(command) else 1
+            attempt = 1
+            while True:
+                try:
+                    return self._exchange(command, read)
+                except (TimeoutError, Gwinstekgpp.ResponseError):
+                    self.resync()
+                    if attempt >= attempts:
+                        raise
+                    attempt += 1
+
+    def _exchange(self, command: str, read: Callable[[], T]) -> T:
+        if self._tracer is not None:
+            return self._traced(command, read)
+        self._serial.write(f"{command}\r".encode())
+        return read()
+
+    @property
+    def tracer(self) -> Tracer|None:
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, value: Tracer|None):
+        """Set the Gwinstekgpp.Tracer receiving the transport events, None to disable the tracing."""
+        self._tracer = value
+
+    def _traced(self, command: str, read: Callable[[], T]|None) -> T|None:
+        """Send the command, call read to receive its responses and give the transaction to the tracer."""
+        data = f"{command}\r".encode()
+        consumed = self._consumed
+        start = time.perf_counter()
+        error = None
+        try:
+            self._serial.write(data)
+            return None if read is None else read()
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self._tracer.command(command, len(data), 0 if read is None else self._consumed - consumed,
+                                 time.perf_counter() - start, error)
+
+    def _write(self, command: str):
+        """Send a command without waiting for any response, unless checkedWrites is enabled."""
+        if self._checkedWrites:
+            self._checkedWrite(command)
+            return
+        if self._pipelineReader is None:
+            self._confirmBaudrate()
+            # Not in the middle of the command and responses of another thread
+            with self._transactionLock:
+                if self._tracer is not None:
+                    self._traced(command, None)
+                    return
+                self._serial.write(f"{command}\r".encode())
+        else:
+            with self._pipelineLock:
+                if self._tracer is not None:
+                    self._traced(command, None)
+                    return
+                self._serial.write(f"{command}\r".encode())
+
+    def _checkedWrite(self, command: str):
+        message = self._query(f"{command};:SYST:ERR?", bytes.decode)
+        if Gwinstekgpp._isError(message):
+            raise self._instrumentError(command, message)
+
+    def _instrumentError(self, command: str, message: str) -> "Gwinstekgpp.InstrumentError":
+        """Create the error of a checked write, with all the errors queued after the first one read."""
+        if self._tracer is not None:
+            self._tracer.instrumentError(message)
+        # The errors left in the queue would be reported against the next setters
+        messages = [message] + self._clearErrors()
+        return Gwinstekgpp.InstrumentError(f"{command} failed: {'; '.join(messages)}")
+
+    def _clearErrors(self) -> list[str]:
+        """Read the instrument error queue until empty.
+
+        @return: The errors read
+        """
+        errors = []
+        # Bounded in case the responses are garbled
+        while len(errors) < Gwinstekgpp._ERROR_QUEUE_SIZE:
+            message = self._query(":SYST:ERR?", bytes.decode)
+            if not Gwinstekgpp._isError(message):
+                break
+            if self._tracer is not None:
+                self._tracer.instrumentError(message)
+            errors.append(message)
+        return errors
+
+    def _query(self, command: str, parser: Callable[[bytes], T]) -> T:
+        """Send a query command and return its response converted by the given parser."""
+        if self._pipelineReader is not None:
+            return self._submit(command, [parser], True).result()
+        return self._transact(command, lambda: self._readResponses([parser])[0])
+
+    def _queryBatch(self, commands: list[str], parsers: list[Callable[[bytes], Any]]) -> list:
+        """Send all the commands in one write separated by ';' and return the parsed responses.
+
+        The queries responses are accepted on one line separated by ';' or on several lines.
+        """
+        checked = self._checkedWrites and len(commands) > len(parsers)
+        if checked:
+            commands = commands + [":SYST:ERR?"]
+            parsers = parsers + [bytes.decode]
+        if self._pipelineReader is not None:
+            values = self._submit(";".join(commands), parsers).result()
+        else:
+            values = self._transact(";".join(commands), lambda: self._readResponses(parsers))
+        if checked:
+            message = values.pop()
+            if Gwinstekgpp._isError(message):
+                raise self._instrumentError(";".join(commands[:-1]), message)
+        return values
+
+    def _readResponses(self, parsers: list[Callable[[bytes], Any]]) -> list:
+        """Read the responses of the given parsers and check that they match their count and format."""
+        responses: list[bytes] = []
+        while len(responses) < len(parsers):
+            responses += self._readLine().split(b';')
+        if len(responses) != len(parsers):
+            raise Gwinstekgpp.ResponseError(f"Receive {len(responses)} responses instead of {len(parsers)}: "
+                                            f"{responses}")
+        try:
+            return [parser(response) for parser, response in zip(parsers, responses)]
+        except (ValueError, IndexError, KeyError) as exception:
+            raise Gwinstekgpp.ResponseError(f"Receive an invalid response in {responses}") from exception
+
+    def _receive(self, view: memoryview) -> int:
+        """Receive the bytes available, at least one, directly into view.
+
+        @return: The number of bytes received, 0 if the timeout expired before
+        """
+        fd = getattr(self._serial, "fd", None)
+        if fd is None:
+            # Not a POSIX port, readinto() blocks until view is full so only the bytes available are asked
+            return self._serial.readinto(view[:max(1, min(self._serial.in_waiting, len(view)))])
+        # The pyserial readinto() allocates a bytes object for each read, read directly from the file descriptor
+        ready, _, _ = select.select([fd], [], [], self._serial.timeout)
+        if len(ready) == 0:
+            return 0
+        size = os.readv(fd, [view])
+        if size == 0:
+            raise serial.SerialException(f"{self._serial.port} is ready to read but returned no data, "
+                                         "device disconnected?")
+        return size
+
+    def _readLineEnd(self) -> int:
+        """Receive until a full line is in the receive buffer and return the index of its end of line.
+
+        The bytes available are received by chunks directly at the end of the preallocated receive buffer,
+        instead of one by one by readline().
+        """
+        searchStart = self._receivedStart
+        while True:
+            end = self._receiveBuffer.find(b"\n", searchStart, self._receivedEnd)
+            if end >= 0:
+                return end
+            if self._receivedEnd == len(self._receiveBuffer):
+                # Move the bytes not read to the start of the buffer, or double it if they fill it
+                size = self._receivedEnd - self._receivedStart
+                if size == len(self._receiveBuffer):
+                    self._receiveBuffer = self._receiveBuffer + bytearray(size)
+                    self._receiveView = memoryview(self._receiveBuffer)
+                else:
+                    self._receiveView[:size] = self._receiveView[self._receivedStart:self._receivedEnd]
+                self._receivedStart, self._receivedEnd = 0, size
+            searchStart = self._receivedEnd
+            size = self._receive(self._receiveView[self._receivedEnd:])
+            if size == 0:
+                raise TimeoutError(f"No response received from {self._serial.port} in {self._serial.timeout}s")
+            self._receivedEnd += size
+
+    def _takeLine(self, end: int) -> bytes:
+        """Remove the next line, ending at end, from the receive buffer and return it without its end of line."""
+        line = bytes(self._receiveView[self._receivedStart:end])
+        self._consumed += end + 1 - self._receivedStart
+        if end + 1 == self._receivedEnd:
+            # Usual case of nothing received after the line, the buffer is then never moved
+            self._receivedStart = self._receivedEnd = 0
+        else:
+            self._receivedStart = end + 1
+        return line
+
+    def _readLine(self) -> bytes:
+        """Return the next line received, without the end of line and the surrounding spaces."""
+        return self._takeLine(self._readLineEnd()).strip()
+
+    def _readFloatsInto(self, out, offset: int, count: int):
+        """Parse count numbers separated by ',' or ';' on one or several lines directly into out.
+
+        Each line is split by bytes.split() and the fields are parsed by float(), this is about 3 times faster
+        with CPython than a Python loop parsing the fields in place in the receive buffer.
+        """
+        index = 0
+        while index < count:
+            line = self._takeLine(self._readLineEnd())
+            for field in line.replace(b";", b",").split(b","):
+                # float() ignores the surrounding spaces and the \r of the end of line
+                try:
+                    value = float(field)
+                except ValueError as exception:
+                    if len(field.strip()) == 0:
+                        continue
+                    raise Gwinstekgpp.ResponseError(f"Receive an invalid number {field}") from exception
+                if index >= count:
+                    raise Gwinstekgpp.ResponseError(f"Receive more than {count} numbers: {line}")
+                out[offset + index] = value
+                index += 1
+
+    def _queryInto(self, command: str, out, offset: int, count: int):
+        """Send a query, possibly compound, returning count numbers and parse them directly into out."""
+        if self._pipelineReader is not None:
+            subCommands = command.split(";")
+            values = self._submit(command, [Gwinstekgpp._parseFloatList] * len(subCommands)).result()
+            for index, value in enumerate(value for responseValues in values for value in responseValues):
+                out[offset + index] = value
+            return
+        self._transact(command, lambda: self._readFloatsInto(out, offset, count))
+
+    def waitSettled(self, channels: list[int], voltageTolerance: float = 0.01, currentTolerance: float = 0.005,
+                    samples: int = 3, timeout: float = 1.0) -> bool:
+        """Wait until the measured voltage and current of all the given channels stay in the tolerance band.
+
+        Each sample measures the 4 channels in one round trip, and the channels are only settled once all of them
+        are in the band during the same consecutive samples. See Channel.waitSettled() for the parameters.
+        """
+        for channel in channels:
+            Gwinstekgpp._channelCheck(channel)
+        measures = [0.0] * 8
+        tolerances = [(channel - 1, voltageTolerance) for channel in channels] \
+            + [(channel + 3, currentTolerance) for channel in channels]
+        return Gwinstekgpp._waitStable(lambda: self._queryInto(":MEAS:VOLT:ALL?;:MEAS:CURR:ALL?", measures, 0, 8),
+                                       measures, tolerances, samples, timeout)
+
+    @staticmethod
+    def _waitStable(sample: Callable[[], None], measures: list[float], tolerances: list[tuple[int, float]],
+                    samples: int, timeout: float) -> bool:
+        """Call sample to fill measures until the measures[index] stay in their tolerance for samples times.
+
+        The band is centered on the first measures of the consecutive samples.
+        """
+        deadline = time.monotonic() + timeout
+        reference = list(measures)
+        stable = 0
+        while True:
+            sample()
+            if stable > 0 and all(abs(measures[index] - reference[index]) <= tolerance
+                                  for index, tolerance in tolerances):
+                stable += 1
+            else:
+                reference[:] = measures
+                stable = 1
+            if stable >= samples:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+
+    def measureAllInto(self, measureType: MeasureType, out, offset: int = 0):
+        """Write the given measure of the 4 channels in out[offset:offset + 4].
+
+        Unlike measureAll() no list of values is returned, out can be an array.array("d"), a NumPy array or any
+        writable sequence, to log at high rate.
+        """
+        if measureType == Gwinstekgpp.MeasureType.ALL:
+            raise ValueError("Get all measure is not supported for all channel")
+        self._queryInto(f":MEAS:{measureType.toSerialStr()}:ALL?", out, offset, 4)
+
+    def _submit(self, command: str, parsers: list[Callable[[bytes], Any]], single: bool = False) \
+            -> concurrent.futures.Future:
+        """Send the command and return a future resolved by the pipeline reader with the parsed responses.
+
+        @param single: Resolve the future with the only parsed response instead of the list of responses
+        """
+        if self._pipelineReader is None:
+            raise RuntimeError("Pipeline not started, call startPipeline() first")
+        future = concurrent.futures.Future()
+        if len(parsers) == 0:
+            self._write(command)
+            future.set_result([])
+            return future
+        data = f"{command}\r".encode()
+        # Enqueue and write under the same lock so that responses come back in the queue order
+        with self._pipelineLock:
+            if self._pipelineFailure is not None:
+                future.set_exception(self._outOfSyncError())
+                return future
+            trace = None if self._tracer is None else (self._tracer, command, len(data), time.perf_counter())
+            self._pipelinePending.put((future, parsers, single, trace))
+            self._serial.write(data)
+        return future
+
+    def _pipelineReadLoop(self):
+        while True:
+            future, parsers, single, trace = self._pipelinePending.get()
+            if future is None:
+                return
+            consumed = self._consumed
+            error = None
+            try:
+                if self._pipelineFailure is not None:
+                    raise self._outOfSyncError()
+                values = self._readResponses(parsers)
+            except Exception as exception:
+                error = exception
+                if self._pipelineFailure is None:
+                    self._pipelineFailure = exception
+                future.set_exception(exception)
+            else:
+                future.set_result(values[0] if single else values)
+            if trace is not None:
+                tracer, command, bytesOut, start = trace
+                tracer.command(command, bytesOut, self._consumed - consumed, time.perf_counter() - start, error)
+
+    def _outOfSyncError(self) -> "Gwinstekgpp.ResponseError":
+        error = Gwinstekgpp.ResponseError("Responses stream out of sync since a previous pipelined query failed, "
+                                          "call stopPipeline() then resync()")
+        error.__cause__ = self._pipelineFailure
+        return error
+
+    def startPipeline(self):
+        """Start the pipelined mode.
+
+        Commands are then sent back to back and a background thread reads the responses in order. The
+        Gwinstekgpp.Channel API keeps working unchanged, use pipeline() to get futures instead of waiting
+        for each response.
+        """
+        if self._pipelineReader is not None:
+            return
+        # The pipeline reader cannot detect the baud rate again
+        self._confirmBaudrate()
+        self._pipelineReader = threading.Thread(target=self._pipelineReadLoop, name="GwinstekgppReader",
+                                                daemon=True)
+        self._pipelineReader.start()
+
+    def stopPipeline(self):
+        """Wait for all the pending responses and go back to the request/response mode."""
+        if self._pipelineReader is None:
+            return
+        with self._pipelineLock:
+            self._pipelinePending.put((None, None, None, None))
+        self._pipelineReader.join()
+        self._pipelineReader = None
+
+    def pipeline(self) -> Pipeline:
+        """Get the channels API returning futures, only usable once startPipeline() has been called."""
+        return Gwinstekgpp.Pipeline(self)
+
+    def enableCache(self, ttl: float|None = None):
+        """Keep the setpoints, states and modes read or written, so that they are not queried again.
+
+        Measures are never cached. Call invalidateCache() when the instrument may have been changed from
+        elsewhere, for example from the front panel. The changes made by the instrument itself are followed: the
+        output state is queried again after a protection setter or a current limit check, and the CH2 values
+        after a CH1 write in tracking mode.
+
+        @param ttl: Duration in seconds after which a cached value is queried again, None to keep it until
+        invalidated
+        """
+        self._cache = dict()
+        self._cacheTtl = ttl
+
+    def disableCache(self):
+        self._cache = None
+
+    def invalidateCache(self, channel: int|None = None):
+        """Forget the cached values of the given channel, or of all channels by default."""
+        if self._cache is None:
+            return
+        if channel is None:
+            self._cache.clear()
+            return
+        for key in list(self._cache):
+            if key[0] == channel:
+                self._cache.pop(key, None)
+
+    def _cachedQuery(self, key: tuple[int, str], command: str, parser: Callable[[bytes], T]) -> T:
+        """Return the cached value of the key if still valid, else query it and cache it."""
+        if self._cache is None:
+            return self._query(command, parser)
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        value = self._query(command, parser)
+        self._cacheStore(key, value)
+        return value
+
+    def _cachedWrite(self, key: tuple[int, str], command: str, value):
+        """Send the command and cache the value written for the key."""
+        self._write(command)
+        if self._cache is not None:
+            self._cacheStore(key, value)
+            self._dropDependents(key)
+
+    def _dropCached(self, key: tuple[int, str]):
+        if self._cache is not None:
+            self._cache.pop(key, None)
+
+    def _dropDependents(self, key: tuple[int, str]):
+        """Forget the cached values that the instrument may change by itself after the write of key."""
+        channel, name = key
+        if name in ("ovpEnable", "ovpValue", "ocpEnable", "ocpValue"):
+            # A protection trips and disables the output as soon as the output is above it
+            self._cache.pop((channel, "outputEnable"), None)
+        if channel == 1:
+            # In series or parallel tracking mode CH2 follows CH1, assumed when the mode is not cached
+            entry = self._cache.get((1, "ch1Ch2Mode"))
+            if entry is None or time.monotonic() >= entry[0] or entry[1] in (Gwinstekgpp.Ch1Ch2Mode.POWER_SERIES,
+                                                                             Gwinstekgpp.Ch1Ch2Mode.POWER_PARALLEL):
+                self.invalidateCache(2)
+
+    def _cacheStore(self, key: tuple[int, str], value):
+        expiration = float("inf") if self._cacheTtl is None else time.monotonic() + self._cacheTtl
+        self._cache[key] = (expiration, value)
+
+    def batch(self) -> Batch:
+        """Create a batch to send several commands and read all their responses in one round trip."""
+        return Gwinstekgpp.Batch(self)
+
+    @staticmethod
+    def _parseState(response: bytes) -> bool:
+        if response == b"ON":
+            return True
+        if response == b"OFF":
+            return False
+        raise ValueError(f"Receive an unexpected state {response}")
+
+    @staticmethod
+    def _parseFlag(response: bytes) -> bool:
+        if response == b"1":
+            return True
+        if response == b"0":
+            return False
+        raise ValueError(f"Receive an unexpected flag {response}")
+
+    @staticmethod
+    def _parseIdentity(response: bytes) -> list[bytes]:
+        fields = response.split(b',')
+        if len(fields) != 4:
+            raise ValueError(f"Receive an unexpected identity {response}")
+        return fields
+
+    @staticmethod
+    def _parseFloatList(response: bytes) -> list[float]:
+        return [float(x) for x in response.split(b',')]
 
     def measureAll(self, measureType: MeasureType) -> list[float]:
         """Return the given measure for the all channel"""
         if measureType == Gwinstekgpp.MeasureType.ALL:
             raise ValueError("Get all measure is not supported for all channel")
-        self._serial.write(f":MEAS:{measureType.toSerialStr()}:ALL?\r".encode())
-        return [float(x) for x in self._serial.readline().strip().split(b',')]
+        return self._query(f":MEAS:{measureType.toSerialStr()}:ALL?", Gwinstekgpp._parseFloatList)
 
     def setOutputStateAll(self, value: bool):
         """Set the actual output state of all channels."""
-        # Same effect as next line self._serial.write(f":ALLOUT{"ON" if value else "OFF"}\r".encode())
-        self._serial.write(f"OUT{"1" if value else "0"}\r".encode())
+        # Same effect as next line self._write(f":ALLOUT{"ON" if value else "OFF"}")
+        self._write(f"OUT{"1" if value else "0"}")
+        self.invalidateCache()
 
     def sourceAll(self, sourceType: SourceType) -> list[float]:
         """Return the actual current or voltage limit for the all channel"""
         if sourceType == Gwinstekgpp.SourceType.RESISTOR:
             raise ValueError("Get actual resistor limit is not supported for all channel")
-        self._serial.write(f":SOUR:{sourceType.toSerialStr()}:ALL?\r".encode())
-        return [float(x) for x in self._serial.readline().strip().split(b',')]
+        return self._query(f":SOUR:{sourceType.toSerialStr()}:ALL?", Gwinstekgpp._parseFloatList)
 
     class Ch1Ch2TrackingMode(enum.Enum):
         INDEPENDANT = 0
@@ -312,11 +1283,13 @@ class Gwinstekgpp:
         """Enable or Disable the given CH1/CH2 tracking mode"""
         if mode == Gwinstekgpp.Ch1Ch2TrackingMode.INDEPENDANT:
             raise ValueError(f"Cannot enable or disable {mode.name} mode")
-        self._serial.write(f"OUTP:{mode.toSerialStr()} {"ON" if enable else "OFF"}\r".encode())
+        self._write(f"OUTP:{mode.toSerialStr()} {"ON" if enable else "OFF"}")
+        self.invalidateCache()
 
     def setCh1Ch2TrackingMode(self, mode: Ch1Ch2TrackingMode):
         """Set CH1/CH2 in the given tracking mode"""
-        self._serial.write(f"TRACK{mode.value}\r".encode())
+        self._write(f"TRACK{mode.value}")
+        self.invalidateCache()
 
     class DisplayBrightness(enum.Enum):
         LOW = 1
@@ -326,19 +1299,17 @@ class Gwinstekgpp:
     @property
     def displayBrightness(self) -> DisplayBrightness:
         """Get the current backlight display level."""
-        self._serial.write(f":DISP:BRIG?\r".encode())
-        return Gwinstekgpp.DisplayBrightness[self._serial.readline().strip().decode().upper()]
+        return self._query(":DISP:BRIG?", lambda response: Gwinstekgpp.DisplayBrightness[response.decode().upper()])
 
     @displayBrightness.setter
     def displayBrightness(self, value: DisplayBrightness):
         """Set the backlight display level."""
-        self._serial.write(f":DISP:BRIG {value.name}\r".encode())
+        self._write(f":DISP:BRIG {value.name}")
 
     @property
     def displayType(self) -> int:
         """Get the current display type between 1 and 7."""
-        self._serial.write(f":DISP:TYPE?\r".encode())
-        return int(self._serial.readline().strip())
+        return self._query(":DISP:TYPE?", int)
 
     @staticmethod
     def _displayTypeCheck(displayType: int):
@@ -351,11 +1322,73 @@ class Gwinstekgpp:
     def displayType(self, value: int):
         """Set the current display type between 1 and 7."""
         Gwinstekgpp._displayTypeCheck(value)
-        self._serial.write(f":DISP:TYPE {value}\r".encode())
+        self._write(f":DISP:TYPE {value}")
+
+    @staticmethod
+    def _isError(message: str) -> bool:
+        return not message.lower().startswith(("no error", "0,"))
 
     def err(self) -> str:
-        self._serial.write(f":SYST:ERR?\r".encode())
-        return self._serial.readline().strip().decode()
+        message = self._query(":SYST:ERR?", bytes.decode)
+        if self._tracer is not None and Gwinstekgpp._isError(message):
+            self._tracer.instrumentError(message)
+        return message
+
+
+class AsyncGwinstekgpp(Gwinstekgpp._View):
+    """asyncio variant of Gwinstekgpp, to poll several instruments from one event loop.
+
+    The channels have the same API as Gwinstekgpp.Channel but getters return awaitables, as well as
+    measureAll(), sourceAll() and err(). Setters are buffered in the transport without waiting. Use
+    open() to create an instance, it needs the pyserial-asyncio package.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__(self)
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+        # Values are awaited, so they cannot be returned from a cache
+        self._cache = None
+
+    @staticmethod
+    async def open(port: str, baudrate: int|None = None) -> "AsyncGwinstekgpp":
+        """Create a non-blocking serial connection with a GW instek GPP power supply.
+
+        @param port: The serial port to use, for exemple on Linux /dev/ttyUSB0
+        @param baudrate: The baud rate configured on the instrument, None to use the one detected by
+        Gwinstekgpp for this port, or 9600
+        """
+        import serial_asyncio
+        if baudrate is None:
+            baudrate = Gwinstekgpp._loadBaudrates().get(os.path.realpath(port), 9600)
+        reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=baudrate, bytesize=8,
+                                                                     parity=serial.PARITY_NONE, stopbits=1)
+        gwinstekgpp = AsyncGwinstekgpp(reader, writer)
+        gwinstekgpp._identity = await gwinstekgpp._query("*IDN?", Gwinstekgpp._parseIdentity)
+        return gwinstekgpp
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    # The identity is queried by open(), so _identityField never queries it
+    _identityField = Gwinstekgpp._identityField
+    productBrand = Gwinstekgpp.productBrand
+    productModel = Gwinstekgpp.productModel
+    productSerial = Gwinstekgpp.productSerial
+    firmwareVersion = Gwinstekgpp.firmwareVersion
+
+    def err(self) -> Awaitable[str]:
+        return self._query(":SYST:ERR?", bytes.decode)
+
+    def _write(self, command: str):
+        self._writer.write(f"{command}\r".encode())
+
+    async def _query(self, command: str, parser: Callable[[bytes], T]) -> T:
+        # The lock keeps each response with its query when several tasks use the same instrument
+        async with self._lock:
+            self._writer.write(f"{command}\r".encode())
+            return parser((await self._reader.readline()).strip())
 
 
 if __name__ == "__main__":
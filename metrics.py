@@ -0,0 +1,99 @@
+from gwinstekgpp import Gwinstekgpp
+import bisect
+import re
+import threading
+from typing import Any
+
+
+class CommandMetrics(Gwinstekgpp.Tracer):
+    """A Gwinstekgpp.Tracer counting the transactions per command family.
+
+    The command family is the command with its channel numbers and values replaced by "n", for exemple
+    "VSETn:n" or ":MEASn:ALL?", so that the counters stay few. Each family records the count, the errors,
+    the timeouts, the bytes in and out and a latency histogram. Use snapshot() to export them.
+    """
+    # Upper bounds in seconds of the latency histogram buckets, the last one counts the slower ones
+    BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+    _NUMBER = re.compile(r"\d+(\.\d*)?")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, dict[str, Any]] = dict()
+        self._instrumentErrors: list[str] = []
+
+    @staticmethod
+    def family(command: str) -> str:
+        return CommandMetrics._NUMBER.sub("n", command)
+
+    def command(self, command: str, bytesOut: int, bytesIn: int, duration: float, error: Exception|None):
+        name = CommandMetrics.family(command)
+        with self._lock:
+            counters = self._families.get(name)
+            if counters is None:
+                counters = {"count": 0, "errors": 0, "timeouts": 0, "bytesOut": 0, "bytesIn": 0, "duration": 0.0,
+                            "maxDuration": 0.0, "histogram": [0] * (len(CommandMetrics.BUCKETS) + 1)}
+                self._families[name] = counters
+            counters["count"] += 1
+            if error is not None:
+                counters["errors"] += 1
+                if isinstance(error, TimeoutError):
+                    counters["timeouts"] += 1
+            counters["bytesOut"] += bytesOut
+            counters["bytesIn"] += bytesIn
+            counters["duration"] += duration
+            counters["maxDuration"] = max(counters["maxDuration"], duration)
+            counters["histogram"][bisect.bisect_left(CommandMetrics.BUCKETS, duration)] += 1
+
+    def instrumentError(self, message: str):
+        with self._lock:
+            self._instrumentErrors.append(message)
+
+    def reset(self):
+        with self._lock:
+            self._families.clear()
+            self._instrumentErrors.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of the counters.
+
+        @return: A dict with "commands", the counters of each command family, and "instrumentErrors", the
+        messages returned by err()
+        """
+        with self._lock:
+            return {"commands": {name: dict(counters, histogram=list(counters["histogram"]))
+                                 for name, counters in self._families.items()},
+                    "instrumentErrors": list(self._instrumentErrors)}
+
+    def quantile(self, command: str, quantile: float) -> float:
+        """Return an upper bound of the given latency quantile of a command family, from its histogram.
+
+        @param command: A command or its family
+        @param quantile: Between 0 and 1, for exemple 0.95
+        """
+        with self._lock:
+            counters = self._families.get(CommandMetrics.family(command))
+            if counters is None:
+                raise KeyError(f"No transaction recorded for {command}")
+            rank = quantile * counters["count"]
+            total = 0
+            for bucket, bucketCount in enumerate(counters["histogram"]):
+                total += bucketCount
+                if total >= rank and bucketCount > 0:
+                    return CommandMetrics.BUCKETS[bucket] if bucket < len(CommandMetrics.BUCKETS) \
+                        else counters["maxDuration"]
+            return counters["maxDuration"]
+
+    def report(self) -> str:
+        """Return the counters as text, slowest command families first."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, counters in sorted(snapshot["commands"].items(), key=lambda item: -item[1]["duration"]):
+            lines.append(f"{name}: count={counters['count']} "
+                         f"mean={counters['duration'] / counters['count'] * 1e3:.2f}ms "
+                         f"p95<={self.quantile(name, 0.95) * 1e3:.2f}ms max={counters['maxDuration'] * 1e3:.2f}ms "
+                         f"errors={counters['errors']} timeouts={counters['timeouts']} "
+                         f"out={counters['bytesOut']}B in={counters['bytesIn']}B")
+        for message in snapshot["instrumentErrors"]:
+            lines.append(f"instrument error: {message}")
+        return "\n".join(lines)
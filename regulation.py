@@ -0,0 +1,153 @@
+from gwinstekgpp import Gwinstekgpp
+import threading
+import time
+from typing import Callable
+
+
+class Regulator:
+    """A PI controller adjusting a channel setpoint so that a measure tracks a target.
+
+    For exemple to regulate the voltage at the device under test (remote sense) by measuring it on one
+    channel and adjusting voltageSet of the channel which powers it, or to emulate a constant power.
+
+    The loop runs at a fixed rate with absolute deadlines. The output is clamped between outputMin and
+    outputMax and its variation limited by slewRate. While the output is limited, the integral term is
+    recomputed from the output applied, so that it does not wind up (anti-windup by back-calculation).
+    """
+    def __init__(self, gwinstekgpp: Gwinstekgpp, measure: Callable[[Gwinstekgpp], float], channel: int,
+                 setpoint: str, target: float, kp: float, ki: float, outputMin: float, outputMax: float,
+                 rate: float = 10.0, slewRate: float|None = None):
+        """@param measure: Return the regulated measure, for exemple Regulator.voltage(1)
+        @param channel: The channel of the adjusted setpoint
+        @param setpoint: The name of the Gwinstekgpp.Channel setter adjusted, for exemple "voltageSet"
+        @param kp: The proportional gain, in setpoint unit per measure unit
+        @param ki: The integral gain, in setpoint unit per measure unit and per second
+        @param rate: The loop rate in Hz
+        @param slewRate: The maximum setpoint variation in setpoint unit per second, None for no limit
+        """
+        Gwinstekgpp._channelCheck(channel)
+        attribute = getattr(Gwinstekgpp.Channel, setpoint, None)
+        if not isinstance(attribute, property) or attribute.fset is None:
+            raise ValueError(f"Invalid channel setpoint {setpoint}")
+        if outputMin > outputMax:
+            raise ValueError(f"Invalid output range {outputMin} > {outputMax}")
+        self._gwinstekgpp = gwinstekgpp
+        self._measure = measure
+        self._channel = gwinstekgpp.channel(channel)
+        self._setpoint = setpoint
+        self.target = target
+        self.kp = kp
+        self.ki = ki
+        self._outputMin = outputMin
+        self._outputMax = outputMax
+        self._period = 1.0 / rate
+        self._slewRate = slewRate
+        self._integral: float|None = None
+        self._output = 0.0
+        self.lastMeasure: float|None = None
+        self.lastError: float|None = None
+        self._running = False
+        self._thread: threading.Thread|None = None
+        self._error: Exception|None = None
+
+    @staticmethod
+    def voltage(channel: int) -> Callable[[Gwinstekgpp], float]:
+        """Measure of the output voltage of the given channel, with the shortest response to parse."""
+        return lambda gwinstekgpp: gwinstekgpp.channel(channel).measure(Gwinstekgpp.MeasureType.VOLTAGE)
+
+    @staticmethod
+    def current(channel: int) -> Callable[[Gwinstekgpp], float]:
+        """Measure of the output current of the given channel, with the shortest response to parse."""
+        return lambda gwinstekgpp: gwinstekgpp.channel(channel).measure(Gwinstekgpp.MeasureType.CURRENT)
+
+    @staticmethod
+    def power(channel: int) -> Callable[[Gwinstekgpp], float]:
+        """Measure of the output power of the given channel, with the shortest response to parse."""
+        return lambda gwinstekgpp: gwinstekgpp.channel(channel).measure(Gwinstekgpp.MeasureType.POWER)
+
+    @property
+    def output(self) -> float:
+        """The last setpoint value written."""
+        return self._output
+
+    def reset(self):
+        """Restart the integral term from the actual setpoint at the next step."""
+        self._integral = None
+
+    def step(self, dt: float|None = None) -> float:
+        """Run one iteration of the loop and return the new setpoint value.
+
+        @param dt: The duration since the previous iteration, by default the loop period
+        """
+        if dt is None:
+            dt = self._period
+        starting = self._integral is None
+        if starting:
+            self._output = min(max(getattr(self._channel, self._setpoint), self._outputMin), self._outputMax)
+        measure = self._measure(self._gwinstekgpp)
+        error = self.target - measure
+        if starting:
+            # Bumpless start: without integral action the output would stay at the actual setpoint
+            self._integral = self._output - self.kp * error
+        unlimited = self.kp * error + self._integral + self.ki * error * dt
+        output = min(max(unlimited, self._outputMin), self._outputMax)
+        if self._slewRate is not None:
+            maxStep = self._slewRate * dt
+            output = min(max(output, self._output - maxStep), self._output + maxStep)
+        # Unchanged when the output is not limited. When limited by its range or by the slew rate, the integral
+        # is set back to the value giving the output applied, instead of accumulating an error it cannot follow
+        self._integral = output - self.kp * error
+        if output != self._output:
+            setattr(self._channel, self._setpoint, output)
+            self._output = output
+        self.lastMeasure = measure
+        self.lastError = error
+        return output
+
+    def run(self, duration: float):
+        """Run the loop in the calling thread during the given duration in seconds."""
+        end = time.monotonic() + duration
+        nextTime = time.monotonic()
+        previousTime = None
+        while nextTime < end and (self._running or self._thread is None):
+            now = time.monotonic()
+            self.step(None if previousTime is None else now - previousTime)
+            previousTime = now
+            nextTime += self._period
+            delay = nextTime - time.monotonic()
+            if delay > 0.0:
+                time.sleep(delay)
+            else:
+                # Late, do not try to catch up the missed iterations
+                nextTime = time.monotonic()
+
+    def start(self):
+        """Run the loop in a background thread until stop()."""
+        if self._running:
+            return
+        self._running = True
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="GwinstekgppRegulator", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.run(float("inf"))
+        except Exception as exception:
+            self._error = exception
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "Regulator":
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
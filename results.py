@@ -0,0 +1,151 @@
+from gwinstekgpp import Gwinstekgpp
+import json
+import numpy
+import os
+from typing import Any, Sequence
+
+
+def instrumentMetadata(gwinstekgpp: Gwinstekgpp) -> dict[str, str]:
+    """The identity of the instrument, to add to the metadata of the recorded results."""
+    return {"productBrand": gwinstekgpp.productBrand, "productModel": gwinstekgpp.productModel,
+            "productSerial": gwinstekgpp.productSerial, "firmwareVersion": gwinstekgpp.firmwareVersion}
+
+
+def load(path: str) -> tuple[dict[str, numpy.ndarray], dict[str, Any]]:
+    """Read a file written by Recorder, in any of its formats.
+
+    @return: The array of each column by name, and the metadata
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        rows = numpy.load(path)
+        with open(f"{path}.json") as metadataFile:
+            description = json.load(metadataFile)
+        return {column: rows[:, index] for index, column in enumerate(description["columns"])}, \
+            description["metadata"]
+    elif extension == ".parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(path)
+        return {column: table.column(column).to_numpy() for column in table.column_names}, \
+            json.loads(table.schema.metadata[b"metadata"])
+    elif extension in (".h5", ".hdf5"):
+        import h5py
+        with h5py.File(path, "r") as h5File:
+            return {column: h5File[column][()] for column in h5File}, \
+                {key: json.loads(value) for key, value in h5File.attrs.items()}
+    raise ValueError(f"Unsupported result file format {extension}")
+
+
+class Recorder:
+    """Append rows of float columns into a preallocated chunk and write the full chunks in bulk.
+
+    The file format is selected from the file extension:
+    - .npy: a 2D array with one column per name, the columns names and the metadata are written in a
+      .json file next to it
+    - .parquet: needs the pyarrow package, the metadata are stored in the schema metadata
+    - .h5 or .hdf5: needs the h5py package, one dataset per column, the metadata are stored in the file
+      attributes
+
+    The memory used is bounded by the chunk size whatever the number of rows.
+    """
+    _NPY_HEADER_SIZE = 128
+
+    def __init__(self, path: str, columns: list[str], metadata: dict[str, Any]|None = None,
+                 chunkSize: int = 4096):
+        """@param metadata: JSON serializable values describing the records, for exemple instrumentMetadata(),
+        the channel roles and the setpoints
+        """
+        self._path = path
+        self._columns = list(columns)
+        self._metadata = metadata or {}
+        self._chunk = numpy.empty((chunkSize, len(self._columns)))
+        self._chunkRows = 0
+        self._rows = 0
+        self._format = os.path.splitext(path)[1].lower()
+        if self._format == ".npy":
+            self._file = open(path, "wb")
+            self._writeNpyHeader()
+            with open(f"{path}.json", "w") as metadataFile:
+                json.dump({"columns": self._columns, "metadata": self._metadata}, metadataFile, indent=2)
+        elif self._format == ".parquet":
+            import pyarrow
+            import pyarrow.parquet
+            schema = pyarrow.schema([(column, pyarrow.float64()) for column in self._columns],
+                                    metadata={"metadata": json.dumps(self._metadata)})
+            self._file = pyarrow.parquet.ParquetWriter(path, schema)
+        elif self._format in (".h5", ".hdf5"):
+            import h5py
+            self._file = h5py.File(path, "w")
+            for column in self._columns:
+                self._file.create_dataset(column, shape=(0,), maxshape=(None,), dtype="f8", chunks=(chunkSize,))
+            for key, value in self._metadata.items():
+                self._file.attrs[key] = json.dumps(value)
+        else:
+            raise ValueError(f"Unsupported result file format {self._format}")
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    @property
+    def columns(self) -> list[str]:
+        return self._columns
+
+    @property
+    def rows(self) -> int:
+        """The number of rows appended, including the ones not yet written."""
+        return self._rows + self._chunkRows
+
+    def append(self, row: Sequence[float]|dict[str, float]):
+        """Append a row given in the columns order or as a dict by column name."""
+        if isinstance(row, dict):
+            row = [row[column] for column in self._columns]
+        self._chunk[self._chunkRows] = row
+        self._chunkRows += 1
+        if self._chunkRows == self._chunk.shape[0]:
+            self.flush()
+
+    def flush(self):
+        """Write the rows of the current chunk."""
+        if self._chunkRows == 0:
+            return
+        rows = self._chunk[:self._chunkRows]
+        if self._format == ".npy":
+            self._file.write(rows.tobytes())
+            self._rows += self._chunkRows
+            self._writeNpyHeader()
+            self._file.flush()
+        elif self._format == ".parquet":
+            import pyarrow
+            self._file.write_table(pyarrow.table({column: rows[:, index].copy()
+                                                  for index, column in enumerate(self._columns)}))
+            self._rows += self._chunkRows
+        else:
+            for index, column in enumerate(self._columns):
+                dataset = self._file[column]
+                dataset.resize((self._rows + self._chunkRows,))
+                dataset[self._rows:] = rows[:, index]
+            self._rows += self._chunkRows
+            self._file.flush()
+        self._chunkRows = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def _writeNpyHeader(self):
+        # Fixed size header so that it can be rewritten with the new number of rows after each flush
+        header = repr({"descr": self._chunk.dtype.str, "fortran_order": False,
+                       "shape": (self._rows, len(self._columns))}).encode()
+        magic = b"\x93NUMPY\x01\x00"
+        padding = Recorder._NPY_HEADER_SIZE - len(magic) - 2 - len(header) - 1
+        header += b" " * padding + b"\n"
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(magic + len(header).to_bytes(2, "little") + header)
+        self._file.seek(max(position, Recorder._NPY_HEADER_SIZE))
@@ -0,0 +1,85 @@
+from gwinstekgpp import Gwinstekgpp
+import time
+from typing import Any
+
+
+class Step:
+    """One step of a Sequence: setpoints applied together, then held during dwell."""
+    def __init__(self, dwell: float, setpoints: list[tuple[int, str, float]], measure: bool = True):
+        """@param dwell: Duration in seconds of the step
+        @param setpoints: The (channel, Gwinstekgpp.Channel setter name, value) to apply at the start of the step
+        @param measure: Measure all channels at the end of the step
+        """
+        self.dwell = dwell
+        self.setpoints = setpoints
+        self.measure = measure
+
+
+class Sequence:
+    """A list of setpoint steps uploaded once and played with a precise timing.
+
+    All the commands are encoded before the start. Each step is then sent as one compound write at its
+    absolute start time, without waiting for any response: the measure of the end of a step is sent in
+    the same write as the setpoints of the next one, and its responses are collected by the pipeline
+    reader thread. The serial round trip is therefore out of the timing critical path, and the timing
+    does not drift with the step count.
+    """
+    def __init__(self, gwinstekgpp: Gwinstekgpp, steps: list[Step]):
+        self._gwinstekgpp = gwinstekgpp
+        self._steps = steps
+        self._measureCommands = [f":MEAS:{measureType.toSerialStr()}:ALL?" for measureType in
+                                 (Gwinstekgpp.MeasureType.VOLTAGE, Gwinstekgpp.MeasureType.CURRENT,
+                                  Gwinstekgpp.MeasureType.POWER)]
+
+    @property
+    def duration(self) -> float:
+        return sum(step.dwell for step in self._steps)
+
+    def _encode(self, step: Step) -> list[str]:
+        # Record the setters in a batch to get their commands, it also forgets their cached values
+        batch = self._gwinstekgpp.batch()
+        for channel, setpoint, value in step.setpoints:
+            setattr(batch.channel(channel), setpoint, value)
+        return batch._commands
+
+    def run(self) -> list[dict[str, Any]]:
+        """Play the sequence and return the measures of the steps, once all have been played.
+
+        Each measure gives the step index, the time relative to the start of the sequence at which the
+        measure has been sent and the lists of the 4 channels voltages, currents and powers.
+        """
+        # Commands sent at each step start: measure of the previous step, then setpoints of the new one
+        writes: list[tuple[float, list[str], int|None]] = []
+        offset = 0.0
+        for index, step in enumerate(self._steps):
+            previous = index - 1 if index > 0 and self._steps[index - 1].measure else None
+            writes.append((offset, self._encode(step), previous))
+            offset += step.dwell
+        if len(self._steps) > 0 and self._steps[-1].measure:
+            writes.append((offset, [], len(self._steps) - 1))
+
+        stopPipeline = self._gwinstekgpp._pipelineReader is None
+        self._gwinstekgpp.startPipeline()
+        parsers = [Gwinstekgpp._parseFloatList] * len(self._measureCommands)
+        pending = []
+        try:
+            start = time.monotonic()
+            for offset, commands, measuredStep in writes:
+                delay = start + offset - time.monotonic()
+                if delay > 0.0:
+                    time.sleep(delay)
+                if measuredStep is None:
+                    if len(commands) > 0:
+                        self._gwinstekgpp._write(";".join(commands))
+                    continue
+                future = self._gwinstekgpp._submit(";".join(self._measureCommands + commands), parsers)
+                pending.append((measuredStep, time.monotonic() - start, future))
+            measures = []
+            for measuredStep, sendTime, future in pending:
+                voltage, current, power = future.result()
+                measures.append({"step": measuredStep, "time": sendTime, "voltage": voltage, "current": current,
+                                 "power": power})
+            return measures
+        finally:
+            if stopPipeline:
+                self._gwinstekgpp.stopPipeline()
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+"""Share one GPP power supply between several processes through a local socket.
+
+The server owns the serial port. Clients use RemoteGwinstekgpp, which has the same channels API as
+Gwinstekgpp. Requests are JSON lines carrying the raw commands, so the whole API works remotely unchanged.
+"""
+from gwinstekgpp import Gwinstekgpp
+import argparse
+import concurrent.futures
+import json
+import socket
+import socketserver
+import threading
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+DEFAULT_ADDRESS = ("127.0.0.1", 5026)
+
+
+class GwinstekgppServer:
+    """Serve a Gwinstekgpp to RemoteGwinstekgpp clients over TCP, by default on the loopback interface only.
+
+    Each request is a JSON line {"commands": [...], "responses": n} and gets a JSON line with the list of the n
+    raw responses, or the error raised by the instrument. The commands of a request are sent in one write.
+
+    Identical requests of different clients waiting for the serial link are merged: the first one is sent and
+    its responses are given to all of them. A request received once the identical one has been sent is sent
+    again, so a client always reads a value at least as recent as its request. Requests containing setters,
+    such as a batch writing a setpoint and reading a state, and :SYST:ERR? are never merged.
+    """
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            server: GwinstekgppServer = self.server.gwinstekgppServer
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    reply = {"responses": server._execute(request["commands"], request["responses"])}
+                except Exception as exception:
+                    reply = {"error": type(exception).__name__, "message": str(exception)}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+    class _TcpServer(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    def __init__(self, gwinstekgpp: Gwinstekgpp, address: tuple[str, int] = DEFAULT_ADDRESS):
+        self._gwinstekgpp = gwinstekgpp
+        self._tcpServer = GwinstekgppServer._TcpServer(address, GwinstekgppServer._Handler)
+        self._tcpServer.gwinstekgppServer = self
+        self._instrumentLock = threading.Lock()
+        self._pendingLock = threading.Lock()
+        self._pending: dict[tuple[str, int], concurrent.futures.Future] = dict()
+        self._thread: threading.Thread|None = None
+        self.transactions = 0
+        self.merged = 0
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._tcpServer.server_address
+
+    def __enter__(self) -> "GwinstekgppServer":
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._tcpServer.serve_forever, name="GwinstekgppServer", daemon=True)
+        self._thread.start()
+
+    def serveForever(self):
+        self._tcpServer.serve_forever()
+
+    def stop(self):
+        self._tcpServer.shutdown()
+        self._tcpServer.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _transaction(self, commands: list[str], responses: int) -> list[str]|None:
+        with self._instrumentLock:
+            self.transactions += 1
+            if responses == 0:
+                self._gwinstekgpp._write(";".join(commands))
+                return None
+            return [response.decode() for response in
+                    self._gwinstekgpp._queryBatch(commands, [bytes] * responses)]
+
+    def _execute(self, commands: list[str], responses: int) -> list[str]|None:
+        # A request with more commands than responses contains setters, each client must write them
+        if responses == 0 or len(commands) > responses or not Gwinstekgpp._idempotent(";".join(commands)):
+            return self._transaction(commands, responses)
+        key = (";".join(commands), responses)
+        with self._pendingLock:
+            future = self._pending.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._pending[key] = future
+            else:
+                self.merged += 1
+        if not leader:
+            return future.result()
+        try:
+            with self._instrumentLock:
+                # From now on the identical requests must not be merged, they could follow a change
+                with self._pendingLock:
+                    del self._pending[key]
+                self.transactions += 1
+                future.set_result([response.decode() for response in
+                                   self._gwinstekgpp._queryBatch(commands, [bytes] * responses)])
+        except Exception as exception:
+            future.set_exception(exception)
+        return future.result()
+
+
+class RemoteGwinstekgpp(Gwinstekgpp._View):
+    """A Gwinstekgpp served by a GwinstekgppServer, with the same channels API.
+
+    Each command is a round trip with the server, setters included, so that the order of the commands of
+    the client is kept. The errors raised by the instrument on the server are raised again by the client.
+    """
+    _ERRORS: dict[str, Callable[[str], Exception]] = {
+        "TimeoutError": TimeoutError,
+        "ResponseError": Gwinstekgpp.ResponseError,
+        "InstrumentError": Gwinstekgpp.InstrumentError,
+        "ValueError": ValueError,
+    }
+
+    def __init__(self, address: tuple[str, int] = DEFAULT_ADDRESS, timeout: float|None = 10.0):
+        super().__init__(self)
+        self._socket = socket.create_connection(address, timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rwb")
+        self._lock = threading.Lock()
+        self._identity: list[bytes]|None = None
+        # Other clients may change the instrument, nothing can be cached
+        self._cache = None
+
+    def __enter__(self) -> "RemoteGwinstekgpp":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    _identityField = Gwinstekgpp._identityField
+    productBrand = Gwinstekgpp.productBrand
+    productModel = Gwinstekgpp.productModel
+    productSerial = Gwinstekgpp.productSerial
+    firmwareVersion = Gwinstekgpp.firmwareVersion
+
+    def batch(self) -> Gwinstekgpp.Batch:
+        return Gwinstekgpp.Batch(self)
+
+    def err(self) -> str:
+        return self._query(":SYST:ERR?", bytes.decode)
+
+    def _request(self, commands: list[str], responses: int) -> list[bytes]:
+        with self._lock:
+            self._file.write(json.dumps({"commands": commands, "responses": responses}).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if len(line) == 0:
+            raise ConnectionError("Connection closed by the server")
+        reply: dict[str, Any] = json.loads(line)
+        if "error" in reply:
+            raise RemoteGwinstekgpp._ERRORS.get(reply["error"], RuntimeError)(reply["message"])
+        return [response.encode() for response in reply["responses"] or []]
+
+    def _write(self, command: str):
+        self._request([command], 0)
+
+    def _query(self, command: str, parser: Callable[[bytes], T]) -> T:
+        return parser(self._request([command], 1)[0])
+
+    def _queryBatch(self, commands: list[str], parsers: list[Callable[[bytes], Any]]) -> list:
+        responses = self._request(commands, len(parsers))
+        try:
+            return [parser(response) for parser, response in zip(parsers, responses)]
+        except (ValueError, IndexError, KeyError) as exception:
+            raise Gwinstekgpp.ResponseError(f"Receive an invalid response in {responses}") from exception
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("port", nargs="?", default="/dev/ttyUSB0", help="Serial port of the instrument")
+    parser.add_argument("--host", default=DEFAULT_ADDRESS[0], help="Address to listen on, loopback by default")
+    parser.add_argument("--listen", type=int, default=DEFAULT_ADDRESS[1], help="TCP port to listen on")
+    arguments = parser.parse_args()
+    gwinstekgpp = Gwinstekgpp(arguments.port)
+    server = GwinstekgppServer(gwinstekgpp, (arguments.host, arguments.listen))
+    print(f"Serving {gwinstekgpp.productModel} {gwinstekgpp.productSerial} on {server.address}, Ctrl+C to stop")
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        gwinstekgpp.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+import os
+import re
+import select
+import threading
+import time
+import tty
+
+
+class VirtualGpp:
+    """A virtual GW instek GPP-4323 power supply, to use the driver without hardware.
+
+    It understands the same commands as Gwinstekgpp and serves them on a pseudo terminal, so that
+    Gwinstekgpp(virtualGpp.port) works unchanged. The link speed is emulated from the baud rate, plus a
+    fixed processing latency per command.
+
+    Each power channel is connected to a resistive load (loadResistance) and goes in current limit when
+    Vset/R is higher than Iset. In load mode, CH1 and CH2 are connected to an external source of voltage
+    externalVoltage.
+    """
+    class Channel:
+        def __init__(self):
+            self.voltageSet = 0.0
+            self.currentSet = 0.0
+            self.outputEnable = False
+            self.ovpEnable = False
+            self.ovpValue = 33.0
+            self.ocpEnable = False
+            self.ocpValue = 3.3
+            self.mode = "IND"
+            self.resistanceSet = 1000
+            self.loadResistance = 10.0
+            self.externalVoltage = 0.0
+
+        def output(self) -> tuple[float, float, bool]:
+            """Return the actual voltage, current and current limit state."""
+            if not self.outputEnable:
+                return 0.0, 0.0, False
+            if self.mode == "CC":
+                return self.externalVoltage, self.currentSet if self.externalVoltage > 0.0 else 0.0, False
+            if self.mode == "CR":
+                return self.externalVoltage, self.externalVoltage / self.resistanceSet, False
+            if self.mode == "CV":
+                return self.externalVoltage, self.currentSet if self.externalVoltage > self.voltageSet else 0.0, \
+                    False
+            current = self.voltageSet / self.loadResistance
+            if current > self.currentSet:
+                return self.currentSet * self.loadResistance, self.currentSet, True
+            return self.voltageSet, current, False
+
+    def __init__(self, baudrate: int = 9600, latency: float = 0.001, serial: str = "SN:VIRTUAL01"):
+        """@param baudrate: The emulated link speed, 0 to not emulate it
+        @param latency: The processing duration in seconds of each command
+        """
+        self.baudrate = baudrate
+        self.latency = latency
+        self.identity = f"GW INSTEK,GPP-4323,{serial},V1.22"
+        self.channels = {channel: VirtualGpp.Channel() for channel in range(1, 5)}
+        self.displayBrightness = "HIGH"
+        self.displayType = 1
+        self.errors: list[str] = []
+        self._master: int|None = None
+        self._slave: int|None = None
+        self._thread: threading.Thread|None = None
+        self._running = False
+        self._commands = [(re.compile(pattern), handler) for pattern, handler in [
+            (r"\*IDN\?", lambda: self.identity),
+            (r"\*OPC\?", lambda: "1"),
+            (r"VSET([1-4])\?", lambda c: f"{self.channels[int(c)].voltageSet:.3f}V"),
+            (r"VSET([1-4]):(.+)", lambda c, v: self._set(int(c), "voltageSet", float(v))),
+            (r"ISET([1-4])\?", lambda c: f"{self.channels[int(c)].currentSet:.3f}A"),
+            (r"ISET([1-4]):(.+)", lambda c, v: self._set(int(c), "currentSet", float(v))),
+            (r"VOUT([1-4])\?", lambda c: f"{self._output(int(c))[0]:.3f}V"),
+            (r"IOUT([1-4])\?", lambda c: f"{self._output(int(c))[1]:.3f}A"),
+            (r":MEAS([1-4]):VOLT\?", lambda c: f"{self._output(int(c))[0]:.3f}"),
+            (r":MEAS([1-4]):CURR\?", lambda c: f"{self._output(int(c))[1]:.3f}"),
+            (r":MEAS([1-4]):POWE\?", lambda c: f"{self._output(int(c))[0] * self._output(int(c))[1]:.3f}"),
+            (r":MEAS([1-4]):ALL\?", lambda c: "{:.3f},{:.3f},{:.3f}".format(*self._measure(int(c)))),
+            (r":MEAS:(VOLT|CURR|POWE):ALL\?", lambda t: ",".join(
+                f"{self._measure(c)[('VOLT', 'CURR', 'POWE').index(t)]:.3f}" for c in range(1, 5))),
+            (r":SOUR([1-4]):VOLT\?", lambda c: f"{self.channels[int(c)].voltageSet:.3f}"),
+            (r":SOUR([1-4]):VOLT (.+)", lambda c, v: self._set(int(c), "voltageSet", float(v))),
+            (r":SOUR([1-4]):CURR:STAT\?", lambda c: "1" if self._output(int(c))[2] else "0"),
+            (r":SOUR([1-4]):CURR\?", lambda c: f"{self.channels[int(c)].currentSet:.3f}"),
+            (r":SOUR([1-4]):CURR (.+)", lambda c, v: self._set(int(c), "currentSet", float(v))),
+            (r":SOUR([1-4]):RES\?", lambda c: f"{self.channels[int(c)].resistanceSet}"),
+            (r":SOUR([1-4]):RES (.+)", lambda c, v: self._set(int(c), "resistanceSet", int(float(v)))),
+            (r":SOUR:(VOLT|CURR):ALL\?", lambda t: ",".join(
+                f"{getattr(self.channels[c], 'voltageSet' if t == 'VOLT' else 'currentSet'):.3f}"
+                for c in range(1, 5))),
+            (r":OUTP([1-4]):STAT\?", lambda c: self._onOff(self.channels[int(c)].outputEnable)),
+            (r":OUTP([1-4]):STAT (.+)", lambda c, v: self._set(int(c), "outputEnable", self._parseState(v))),
+            (r":OUTP([1-4]):(OVP|OCP):STAT\?", lambda c, p: self._onOff(getattr(self.channels[int(c)],
+                                                                               f"{p.lower()}Enable"))),
+            (r":OUTP([1-4]):(OVP|OCP):STAT (.+)", lambda c, p, v: self._set(int(c), f"{p.lower()}Enable",
+                                                                            self._parseState(v))),
+            (r":OUTP([1-4]):(OVP|OCP)\?", lambda c, p: f"{getattr(self.channels[int(c)],
+                                                                   f'{p.lower()}Value'):.3f}"),
+            (r":OUTP([1-4]):(OVP|OCP) (.+)", lambda c, p, v: self._set(int(c), f"{p.lower()}Value", float(v))),
+            (r"OUT([01])", lambda v: self._setAll("outputEnable", v == "1")),
+            (r":ALLOUT(ON|OFF)", lambda v: self._setAll("outputEnable", v == "ON")),
+            (r"MODE([12])\?", lambda c: self.channels[int(c)].mode),
+            (r":LOAD([12]):(CV|CC|CR)\?", lambda c, m: self._onOff(self.channels[int(c)].mode == m)),
+            (r":LOAD([12]):(CV|CC|CR) (ON|OFF)", lambda c, m, v: self._set(int(c), "mode",
+                                                                           m if v == "ON" else "IND")),
+            (r":LOAD([12]):RES\?", lambda c: f"{self.channels[int(c)].resistanceSet}"),
+            (r":LOAD([12]):RES (.+)", lambda c, v: self._set(int(c), "resistanceSet", int(float(v)))),
+            (r"TRACK([0-2])", lambda m: self._track(("IND", "SER", "PAR")[int(m)])),
+            (r"OUTP:(SER|PAR) (ON|OFF)", lambda m, v: self._track(m if v == "ON" else "IND")),
+            (r":DISP:BRIG\?", lambda: self.displayBrightness),
+            (r":DISP:BRIG (LOW|MIDDLE|HIGH)", lambda v: setattr(self, "displayBrightness", v)),
+            (r":DISP:TYPE\?", lambda: f"{self.displayType}"),
+            (r":DISP:TYPE ([1-7])", lambda v: setattr(self, "displayType", int(v))),
+            (r":SYST:ERR\?", lambda: self.errors.pop(0) if len(self.errors) > 0 else "No Error."),
+        ]]
+
+    @staticmethod
+    def _onOff(value: bool) -> str:
+        return "ON" if value else "OFF"
+
+    @staticmethod
+    def _parseState(value: str) -> bool:
+        return value in ("1", "ON")
+
+    def _set(self, channel: int, name: str, value):
+        setattr(self.channels[channel], name, value)
+        self._protect(channel)
+
+    def _setAll(self, name: str, value):
+        for channel in self.channels:
+            self._set(channel, name, value)
+
+    def _track(self, mode: str):
+        self.channels[1].mode = mode
+        self.channels[2].mode = mode
+
+    def _protect(self, channel: int):
+        state = self.channels[channel]
+        voltage, current, _ = state.output()
+        if (state.ovpEnable and voltage > state.ovpValue) or (state.ocpEnable and current > state.ocpValue):
+            state.outputEnable = False
+
+    def _output(self, channel: int) -> tuple[float, float, bool]:
+        return self.channels[channel].output()
+
+    def _measure(self, channel: int) -> tuple[float, float, float]:
+        voltage, current, _ = self._output(channel)
+        return voltage, current, voltage * current
+
+    def handle(self, line: str) -> list[str]:
+        """Execute a line of commands separated by ';' and return the responses of the queries."""
+        responses = []
+        for command in line.strip().split(";"):
+            command = command.strip().upper()
+            if len(command) == 0:
+                continue
+            for pattern, handler in self._commands:
+                match = pattern.fullmatch(command)
+                if match is not None:
+                    try:
+                        response = handler(*match.groups())
+                    except ValueError:
+                        self.errors.append(f"-224,Illegal parameter value in {command}")
+                        response = None
+                    if command.endswith("?"):
+                        responses.append(response)
+                    break
+            else:
+                self.errors.append(f"-100,Command error {command}")
+        return responses
+
+    def _byteDelay(self, size: int) -> float:
+        # 10 bits per byte with 8 data bits, 1 start bit and 1 stop bit
+        return size * 10 / self.baudrate if self.baudrate > 0 else 0.0
+
+    @property
+    def port(self) -> str:
+        """The pseudo terminal path to open with Gwinstekgpp, available once started."""
+        if self._slave is None:
+            raise RuntimeError("Virtual GPP not started")
+        return os.ttyname(self._slave)
+
+    def start(self) -> str:
+        """Serve the virtual GPP on a new pseudo terminal in a background thread.
+
+        @return: The pseudo terminal path
+        """
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="VirtualGpp", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        self._thread = None
+        os.close(self._slave)
+        os.close(self._master)
+        self._master = self._slave = None
+
+    def __enter__(self) -> "VirtualGpp":
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def _serve(self):
+        buffer = b""
+        while self._running:
+            # Wake up regularly to check if stopped
+            readable, _, _ = select.select([self._master], [], [], 0.1)
+            if len(readable) == 0:
+                continue
+            data = os.read(self._master, 4096)
+            buffer += data
+            while b"\r" in buffer or b"\n" in buffer:
+                end = min(index for index in (buffer.find(b"\r"), buffer.find(b"\n")) if index >= 0)
+                line, buffer = buffer[:end], buffer[end + 1:]
+                if len(line) == 0:
+                    continue
+                time.sleep(self._byteDelay(len(line) + 1) + self.latency)
+                responses = self.handle(line.decode(errors="replace"))
+                for response in responses:
+                    reply = f"{response}\r\n".encode()
+                    time.sleep(self._byteDelay(len(reply)))
+                    os.write(self._master, reply)
+
+
+if __name__ == "__main__":
+    with VirtualGpp() as virtualGpp:
+        print(f"Virtual GPP-4323 on {virtualGpp.port}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
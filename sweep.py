@@ -0,0 +1,309 @@
+from gwinstekgpp import Gwinstekgpp
+import itertools
+import json
+import math
+import os
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+
+class Axis:
+    """One swept setpoint: a channel setter of Gwinstekgpp.Channel and the values to apply."""
+    def __init__(self, channel: int, setpoint: str, values: Iterable[float]):
+        """@param setpoint: The name of a Gwinstekgpp.Channel setter, for exemple "voltageSet" """
+        Gwinstekgpp._channelCheck(channel)
+        Axis._setpointCheck(setpoint)
+        self.channel = channel
+        self.setpoint = setpoint
+        self.values = list(values)
+
+    @staticmethod
+    def _setpointCheck(setpoint: str):
+        attribute = getattr(Gwinstekgpp.Channel, setpoint, None)
+        if not isinstance(attribute, property) or attribute.fset is None:
+            raise ValueError(f"Invalid channel setpoint {setpoint}")
+
+    @staticmethod
+    def range(channel: int, setpoint: str, start: float, stop: float, step: float) -> "Axis":
+        """Create an axis from start to stop included by step.
+
+        Values are computed from their index so that rounding errors do not accumulate.
+        """
+        if step == 0.0:
+            raise ValueError("Invalid step value 0")
+        count = math.floor((stop - start) / step + 1e-9) + 1
+        return Axis(channel, setpoint, [start + index * step for index in range(max(count, 0))])
+
+    @property
+    def name(self) -> str:
+        return f"ch{self.channel}.{self.setpoint}"
+
+
+class Checkpoint:
+    """The completed points of a sweep saved in a JSON lines file, to resume an interrupted sweep.
+
+    The first line describes the sweep, then each line is one point, written and flushed to the disk as soon
+    as it is completed. A last line truncated by an interruption is ignored.
+    """
+    def __init__(self, path: str, axes: list[str], metadata: dict[str, Any]|None = None):
+        """Open the checkpoint file, or create it if it does not exist.
+
+        @param axes: The names of the sweep axes
+        @param metadata: JSON serializable values describing the sweep, for exemple the instrument serial
+        number. The axes and the metadata must match the ones of an existing file, to not resume another sweep.
+        """
+        header = json.loads(json.dumps({"axes": axes} | (metadata or {})))
+        self._points: dict[tuple[float, ...], dict[str, Any]] = dict()
+        if os.path.exists(path):
+            with open(path) as checkpointFile:
+                lines = checkpointFile.read().split("\n")
+            try:
+                saved = json.loads(lines[0])
+            except ValueError:
+                raise ValueError(f"Invalid checkpoint file {path}")
+            differences = sorted(key for key in header.keys() | saved.keys() if header.get(key) != saved.get(key))
+            if len(differences) > 0:
+                raise ValueError(f"Checkpoint {path} was saved by a sweep with a different {', '.join(differences)}, "
+                                 "remove it to measure again")
+            for line in lines[1:]:
+                try:
+                    point = json.loads(line)
+                except ValueError:
+                    continue
+                if all(name in point for name in axes):
+                    self._points[Checkpoint._key([point[name] for name in axes])] = point
+        # Rewritten to drop a truncated last line, so that the next point starts on its own line. The new file
+        # replaces the previous one once complete, an interruption during the rewrite keeps the saved points.
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as checkpointFile:
+            checkpointFile.write(json.dumps(header) + "\n")
+            for point in self._points.values():
+                checkpointFile.write(json.dumps(point) + "\n")
+            checkpointFile.flush()
+            os.fsync(checkpointFile.fileno())
+        os.replace(temporary, path)
+        self._file = open(path, "a")
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    @staticmethod
+    def _key(values: Iterable[float]) -> tuple[float, ...]:
+        # Values computed again on resume may differ in the last digits
+        return tuple(round(value, 9) for value in values)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def get(self, values: Iterable[float]) -> dict[str, Any]|None:
+        """Return the point completed at the given axes values, None if not yet completed."""
+        return self._points.get(Checkpoint._key(values))
+
+    def add(self, values: Iterable[float], point: dict[str, Any]):
+        self._points[Checkpoint._key(values)] = point
+        self._file.write(json.dumps(point) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Sweep:
+    """Apply every point of a grid of setpoints, wait for the settle and measure.
+
+    The first axis is the outermost one, only the setpoints that change are written at each point. The
+    initial setpoints are applied before the first point, and the final ones always at the end, even on
+    abort or exception, to bring the device under test back to a safe state.
+
+    Setpoints with a slew rate are ramped with Gwinstekgpp.Channel.ramp() instead of jumping to the new value,
+    and a ramp stopped by a current limit or a protection aborts the sweep. The final setpoints are always
+    ramped to the end.
+
+    With a checkpoint file, each point is saved once measured without abort. Running the sweep again then
+    skips the points already saved and only measures the missing ones. The file also records the instrument
+    serial number and the initial, final and settle parameters, it is not resumed by a different sweep. Once
+    run() or refine() completes without abort, it is renamed with a .done suffix so that the next sweep
+    measures again, a refine() following run() on the same Sweep continues it.
+    """
+    Setpoint = tuple[int, str, float]
+
+    def __init__(self, gwinstekgpp: Gwinstekgpp, axes: list[Axis],
+                 measure: Callable[[Gwinstekgpp], dict[str, Any]],
+                 settle: float|Callable[[Gwinstekgpp, list[Setpoint]], None] = 1.0,
+                 aborts: list[Callable[[Gwinstekgpp], str|None]]|None = None,
+                 initial: list[Setpoint]|None = None, final: list[Setpoint]|None = None,
+                 checkpoint: str|None = None, slewRates: dict[tuple[int, str], float]|None = None,
+                 monitor: list[int]|None = None):
+        """@param measure: Called at each point once settled, return the measures to add to the point
+        @param settle: The duration to wait in seconds after setpoints changes, or a function called with
+        the changed setpoints which returns once the outputs are settled
+        @param aborts: Called after each point, the sweep stop if one of them return an error message
+        @param initial: The setpoints (channel, setpoint name, value) to apply before the first point
+        @param final: The setpoints (channel, setpoint name, value) to apply at the end, in order
+        @param checkpoint: The path of the checkpoint file, see Checkpoint, None to not save the points
+        @param slewRates: The slew rates in V/s or A/s by (channel, setpoint name) of the setpoints to ramp
+        @param monitor: The channels checked during the ramps, by default the ramped channel
+        """
+        self._gwinstekgpp = gwinstekgpp
+        self._axes = axes
+        self._measure = measure
+        self._settle = settle
+        self._aborts = aborts or []
+        self._initial = initial or []
+        self._final = final or []
+        for _, setpoint, _ in self._initial + self._final:
+            Axis._setpointCheck(setpoint)
+        self._checkpoint = checkpoint
+        self._slewRates = slewRates or {}
+        self._monitor = monitor
+        self._measured: dict[tuple[float, ...], dict[str, Any]] = dict()
+        self._completed = False
+        self.abortReason: str|None = None
+
+    @staticmethod
+    def currentLimitAbort(channel: int) -> Callable[[Gwinstekgpp], str|None]:
+        """Abort condition when the current limit of the given channel is reached."""
+        def abort(gwinstekgpp: Gwinstekgpp) -> str|None:
+            if gwinstekgpp.channel(channel).currentLimitState:
+                return f"current limit raise in channel {channel}"
+            return None
+        return abort
+
+    @staticmethod
+    def waitSettled(channels: list[int], voltageTolerance: float = 0.01, currentTolerance: float = 0.005,
+                    samples: int = 3, timeout: float = 1.0) -> Callable[[Gwinstekgpp, list[Setpoint]], None]:
+        """Settle policy waiting for the measures of the given channels to be settled.
+
+        See Gwinstekgpp.waitSettled() for the parameters, all the channels are sampled together. A point not
+        settled after timeout is measured anyway.
+        """
+        def settle(gwinstekgpp: Gwinstekgpp, setpoints: list[Sweep.Setpoint]):
+            gwinstekgpp.waitSettled(channels, voltageTolerance, currentTolerance, samples, timeout)
+        # Recorded in the checkpoint
+        settle.parameters = {"waitSettled": {"channels": channels, "voltageTolerance": voltageTolerance,
+                                             "currentTolerance": currentTolerance, "samples": samples,
+                                             "timeout": timeout}}
+        return settle
+
+    @property
+    def points(self) -> int:
+        return math.prod(len(axis.values) for axis in self._axes)
+
+    def _apply(self, setpoints: list[Setpoint], monitored: bool = True) -> str|None:
+        """@return: The reason of a stopped ramp, None if all the setpoints are applied"""
+        for channel, setpoint, value in setpoints:
+            slewRate = self._slewRates.get((channel, setpoint))
+            if slewRate is None:
+                setattr(self._gwinstekgpp.channel(channel), setpoint, value)
+                continue
+            reason = self._gwinstekgpp.channel(channel).ramp(setpoint, value, slewRate,
+                                                             monitor=self._monitor if monitored else [])
+            if reason is not None:
+                return reason
+        if callable(self._settle):
+            self._settle(self._gwinstekgpp, setpoints)
+        elif self._settle > 0.0:
+            time.sleep(self._settle)
+        return None
+
+    def run(self) -> Iterator[dict[str, Any]]:
+        """Run the sweep and yield each point as a dict of the axes values followed by the measures.
+
+        Points found in the checkpoint are yielded without being measured again. On abort the generator stops
+        and abortReason gives the reason.
+        """
+        self._measured = dict()
+        return self._run(itertools.product(*[axis.values for axis in self._axes]), False)
+
+    def refine(self, key: str, count: int, minStep: float) -> Iterator[dict[str, Any]]:
+        """Measure up to count more points of a one axis sweep where the curve of key changes the most.
+
+        Each new point is the middle of the two neighbour points, already measured by run() or refine(), with
+        the biggest difference of key. So the points concentrate where the curve changes fast instead of being
+        spread on a fine grid. Intervals smaller than 2 * minStep are not split.
+
+        @param key: The measure to follow, for exemple "efficiency"
+        """
+        if len(self._axes) != 1:
+            raise ValueError(f"Refine is only supported for one axis sweep, not {len(self._axes)}")
+        return self._run(self._refinements(key, count, minStep), True)
+
+    def _refinements(self, key: str, count: int, minStep: float) -> Iterator[tuple[float]]:
+        for _ in range(count):
+            measured = sorted((values[0], point[key]) for values, point in self._measured.items())
+            best: tuple[float, float]|None = None
+            for (value0, measure0), (value1, measure1) in zip(measured, measured[1:]):
+                if value1 - value0 < 2 * minStep - 1e-9:
+                    continue
+                change = abs(measure1 - measure0)
+                if best is None or change > best[0]:
+                    best = (change, (value0 + value1) / 2)
+            if best is None:
+                return
+            yield (best[1],)
+
+    def _openCheckpoint(self, continued: bool) -> Checkpoint:
+        done = f"{self._checkpoint}.done"
+        if continued and self._completed and os.path.exists(done) and not os.path.exists(self._checkpoint):
+            # Continue the checkpoint of the previous run() or refine() of this sweep
+            os.replace(done, self._checkpoint)
+        settle = self._settle
+        if callable(settle):
+            settle = getattr(settle, "parameters", getattr(settle, "__qualname__", repr(settle)))
+        return Checkpoint(self._checkpoint, [axis.name for axis in self._axes],
+                          {"instrument": self._gwinstekgpp.productSerial, "initial": self._initial,
+                           "final": self._final, "settle": settle})
+
+    def _run(self, points: Iterable[tuple[float, ...]], continued: bool) -> Iterator[dict[str, Any]]:
+        """@param continued: Continue the checkpoint of the previous completed run() or refine()"""
+        self.abortReason = None
+        checkpoint = None
+        if self._checkpoint is not None:
+            checkpoint = self._openCheckpoint(continued)
+        try:
+            previous: tuple[float, ...]|None = None
+            for values in points:
+                point = None if checkpoint is None else checkpoint.get(values)
+                if point is not None:
+                    self._measured[Checkpoint._key(values)] = point
+                    yield point
+                    continue
+                if previous is None:
+                    for channel, setpoint, value in self._initial:
+                        self.abortReason = self._apply([(channel, setpoint, value)])
+                        if self.abortReason is not None:
+                            return
+                self.abortReason = self._apply([(axis.channel, axis.setpoint, value) for index, (axis, value)
+                                                in enumerate(zip(self._axes, values))
+                                                if previous is None or previous[index] != value])
+                if self.abortReason is not None:
+                    return
+                previous = values
+                point = {axis.name: value for axis, value in zip(self._axes, values)}
+                point.update(self._measure(self._gwinstekgpp))
+                for abort in self._aborts:
+                    self.abortReason = abort(self._gwinstekgpp)
+                    if self.abortReason is not None:
+                        break
+                if self.abortReason is not None:
+                    # Measured in a faulty state, it is not valid to resume
+                    yield point
+                    return
+                self._measured[Checkpoint._key(values)] = point
+                if checkpoint is not None:
+                    checkpoint.add(values, point)
+                yield point
+            if checkpoint is not None:
+                # Completed, the next sweep must not resume it
+                checkpoint.close()
+                os.replace(self._checkpoint, f"{self._checkpoint}.done")
+            self._completed = True
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+            for channel, setpoint, value in self._final:
+                self._apply([(channel, setpoint, value)], False)